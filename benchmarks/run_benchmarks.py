@@ -0,0 +1,265 @@
+"""
+Benchmark suite for the recurrence, query and CRUD hot paths.
+
+Generates reproducible synthetic populations (mixed weekly and monthly transactions) and times the
+public functions over several population sizes and date windows. Database benchmarks run against a
+temporary SQLite file. Results are written as JSON, and can be compared with a previous run:
+
+    python benchmarks/run_benchmarks.py --sizes 1000,100000 --windows 1m,1y,5y --output results.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --threshold 1.2
+"""
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))  # Run from a checkout without installing
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+from sqlalchemy import delete, func
+from event_manager.db_session import init_engine, session_scope
+from event_manager.event import Event
+from event_manager.event_crud import (
+    create_event, create_events, delete_event, delete_events, get_event_by_id, update_event, update_events
+)
+from event_manager.event_extensions import Transaction, get_user_transactions
+from event_manager.event_index import EventIndex
+from event_manager.initialize_db import initialize_database
+from event_manager.utils import count_weekly_events, get_event_weeks, get_events_in_range, get_occurrence_df
+
+WINDOWS = {
+    "1m": timedelta(days=30),
+    "1y": timedelta(days=365),
+    "5y": timedelta(days=1825)
+}
+
+WINDOW_START = datetime(2025, 1, 1)
+SAMPLE_SIZE = 1000  # Events used by the per-event benchmarks
+USERS_PER_1000_EVENTS = 100
+
+
+# n | int, seed | int => transactions | list[Transaction]
+def generate_transactions(n: int, seed: int = 0) -> List[Transaction]:
+    """
+    Builds n transactions: half weekly (1 to 4 weeks, 1 to 3 weekdays), half monthly (1 to 2 days,
+    some using the last day), starting over two years, a third of them with an end date.
+    """
+    rng = random.Random(seed)
+    users = max(1, n * USERS_PER_1000_EVENTS // 1000)
+
+    transactions = []
+    for i in range(n):
+        weekly = rng.random() < 0.5
+        start_date = WINDOW_START - timedelta(days=rng.randint(0, 730))
+        end_date = start_date + timedelta(days=rng.randint(30, 2000)) if rng.random() < 1 / 3 else None
+
+        transactions.append(Transaction(
+            name=f"Transaction {i}",
+            start_date=start_date,
+            end_date=end_date,
+            recurrent_type="weekly" if weekly else "monthly",
+            interval=rng.randint(1, 4) if weekly else 1,
+            days=sorted(rng.sample(range(7), rng.randint(1, 3))) if weekly else sorted(rng.sample(range(1, 32), rng.randint(1, 2))),
+            use_last_day=not weekly and rng.random() < 0.5,
+            amount=round(rng.uniform(1, 500), 2),
+            transaction_type=rng.choice(["income", "expense", "savings"]),
+            user_id=f"user-{rng.randrange(users)}"
+        ))
+
+    return transactions
+
+
+def _time(run: Callable, repeat: int, setup: Optional[Callable] = None) -> Dict[str, float]:
+    """Runs `run(setup())` repeat times and returns its timings in seconds. setup isn't timed."""
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup is not None else None
+        started = time.perf_counter()
+        run(argument) if setup is not None else run()
+        timings.append(time.perf_counter() - started)
+
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings)
+    }
+
+
+def memory_benchmarks(events: List[Transaction], window: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Times the in-memory functions over the population and one window."""
+    start = WINDOW_START
+    end = start + WINDOWS[window]
+    sample = events[:SAMPLE_SIZE]
+    index = EventIndex(events)
+    dates = [start + timedelta(days=day) for day in range(0, WINDOWS[window].days, max(1, WINDOWS[window].days // 30))]
+
+    event_param = {
+        "name": "New event",
+        "start_date": start,
+        "end_date": end,
+        "recurrent_type": "weekly",
+        "interval": 1,
+        "days": [0, 3]
+    }
+
+    # get_event_weeks is limited to 5 years, so the sampled rules are moved into the window
+    week_params = [
+        {**event_param, "recurrent_type": e.recurrent_type, "interval": e.interval, "days": e.days}
+        for e in sample
+    ]
+
+    return {
+        "Event.get_occurrences": _time(lambda: [e.get_occurrences(start, end) for e in sample], repeat),
+        "Event.occurs_on": _time(lambda: [e.occurs_on(date) for e in sample for date in dates], repeat),
+        "get_occurrence_df": _time(lambda: get_occurrence_df(events, start, end), repeat),
+        "get_events_in_range": _time(lambda: get_events_in_range(events, start, end), repeat),
+        "get_events_in_range[EventIndex]": _time(lambda: get_events_in_range(index, start, end), repeat),
+        "count_weekly_events": _time(lambda: count_weekly_events(event_param, events), repeat),
+        "count_weekly_events[EventIndex]": _time(lambda: count_weekly_events(event_param, index), repeat),
+        "get_event_weeks": _time(lambda: [get_event_weeks(param) for param in week_params], repeat)
+    }
+
+
+def database_benchmarks(n: int, seed: int, window: str, repeat: int) -> Dict[str, Dict[str, float]]:
+    """Times the CRUD functions and get_user_transactions against the current (temporary) database."""
+    start = WINDOW_START
+    end = start + WINDOWS[window]
+    user_ids = [f"user-{i}" for i in range(min(SAMPLE_SIZE // 10, max(1, n * USERS_PER_1000_EVENTS // 1000)))]
+
+    def clear():
+        with session_scope() as session:
+            session.execute(delete(Event))
+
+    def fresh_population():
+        clear()
+        return generate_transactions(n, seed)
+
+    results = {"create_events": _time(create_events, repeat, setup=fresh_population)}
+
+    with session_scope() as session:
+        ids = [row[0] for row in session.query(Event.id).order_by(Event.id).limit(SAMPLE_SIZE)]
+
+    results["get_user_transactions"] = _time(lambda: [get_user_transactions(u, start, end) for u in user_ids], repeat)
+    results["get_event_by_id"] = _time(lambda: [get_event_by_id(i) for i in ids[:100]], repeat)
+    results["update_event"] = _time(lambda: [update_event(i, {"amount": 10.0}) for i in ids[:100]], repeat)
+    results["update_events"] = _time(lambda: update_events(ids, {"amount": 20.0}), repeat)
+    results["create_event"] = _time(
+        lambda batch: [create_event(e) for e in batch], repeat,
+        setup=lambda: generate_transactions(100, seed + 1)
+    )
+
+    def created_ids():
+        with session_scope() as session:
+            last_id = session.query(func.max(Event.id)).scalar() or 0
+        create_events(generate_transactions(SAMPLE_SIZE, seed + 2))
+        with session_scope() as session:
+            return [row[0] for row in session.query(Event.id).filter(Event.id > last_id)]
+
+    results["delete_event"] = _time(lambda batch: [delete_event(i) for i in batch[:100]], repeat, setup=created_ids)
+    results["delete_events"] = _time(delete_events, repeat, setup=created_ids)
+
+    return results
+
+
+def run(sizes: List[int], windows: List[str], repeat: int, seed: int, with_db: bool) -> Dict:
+    """Runs every benchmark and returns the JSON-serializable report."""
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "sqlalchemy": sqlalchemy.__version__,
+            "sizes": sizes,
+            "windows": windows,
+            "repeat": repeat,
+            "seed": seed
+        },
+        "results": []
+    }
+
+    def record(name, size, window, timings):
+        report["results"].append({"name": name, "size": size, "window": window, **timings})
+        print(f"{name:<35} {size:>9} {window:>4} {timings['median'] * 1000:>12.3f} ms", flush=True)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if with_db:
+            init_engine(f"sqlite:///{directory}/benchmark.db")
+            initialize_database()
+
+        for size in sizes:
+            events = generate_transactions(size, seed)
+            for window in windows:
+                for name, timings in memory_benchmarks(events, window, repeat).items():
+                    record(name, size, window, timings)
+
+            if with_db:
+                for name, timings in database_benchmarks(size, seed, windows[0], repeat).items():
+                    record(name, size, windows[0], timings)
+
+        if with_db:
+            init_engine()  # Release the temporary database before it is removed
+
+    return report
+
+
+def compare(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """Returns a line for every benchmark whose median got slower than threshold times the baseline."""
+    previous = {(r["name"], r["size"], r["window"]): r["median"] for r in baseline["results"]}
+
+    regressions = []
+    for result in report["results"]:
+        before = previous.get((result["name"], result["size"], result["window"]))
+        if before and result["median"] > before * threshold:
+            regressions.append(
+                f"{result['name']} (size={result['size']}, window={result['window']}): "
+                f"{before * 1000:.3f} ms -> {result['median'] * 1000:.3f} ms ({result['median'] / before:.2f}x)"
+            )
+
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1000,10000", help="Comma-separated population sizes (up to 1000000).")
+    parser.add_argument("--windows", default="1m,1y,5y", help=f"Comma-separated windows among {', '.join(WINDOWS)}.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; min, median and mean are reported.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the synthetic populations.")
+    parser.add_argument("--no-db", action="store_true", help="Skip the database benchmarks.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file receiving the results.")
+    parser.add_argument("--compare", help="Previous JSON results to compare with.")
+    parser.add_argument("--threshold", type=float, default=1.2, help="Slowdown ratio reported as a regression.")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    windows = args.windows.split(",")
+    unknown = [window for window in windows if window not in WINDOWS]
+    if unknown:
+        parser.error(f"Unknown windows: {', '.join(unknown)}")
+
+    report = run(sizes, windows, args.repeat, args.seed, not args.no_db)
+
+    Path(args.output).write_text(json.dumps(report, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(report, json.loads(Path(args.compare).read_text()), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
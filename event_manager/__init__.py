@@ -1,33 +1,115 @@
 """
 Event Manager module for handling recurring events and transactions.
+
+Submodules and the names below are imported on first access, so `import event_manager` is cheap:
+pandas and NumPy are only loaded by the DataFrame and array APIs, and no database engine is
+created before the first query.
 """
+from importlib import import_module
+from typing import TYPE_CHECKING
+
+# Public name => submodule defining it
+_EXPORTS = {
+    # Base class
+    "Event": "event",
+
+    # Extensions
+    "Transaction": "event_extensions",
+    "TransactionSnapshot": "event_extensions",
+    "get_user_transactions": "event_extensions",
+    "iter_transaction_batches": "event_extensions",
+    "get_cash_flow": "event_extensions",
+    "get_user_cash_flow": "event_extensions",
+
+    # CRUD
+    "create_event": "event_crud",
+    "update_event": "event_crud",
+    "delete_event": "event_crud",
+    "get_event_by_id": "event_crud",
+    "create_events": "event_crud",
+    "update_events": "event_crud",
+    "delete_events": "event_crud",
+
+    # Indexes and caches
+    "EventIndex": "event_index",
+    "DateIndex": "event_index",
+    "EventSet": "event_set",
+    "OccurrenceStore": "occurrence_store",
+    "OccurrenceCache": "occurrence_cache",
+    "OccurrenceWindow": "occurrence_window",
+
+    # Utility functions
+    "get_occurrence_df": "utils",
+    "iter_occurrences": "utils",
+    "iter_occurrence_chunks": "utils",
+
+    # Batch jobs
+    "project_users": "projection",
+}
+
+# Submodules reachable as attributes of the package
+_SUBMODULES = {
+    "async_crud", "async_session", "db_session", "event", "event_crud", "event_extensions", "event_index",
+    "event_set", "initialize_db", "instrumentation", "occurrence_cache", "occurrence_engine",
+    "occurrence_export", "occurrence_store", "occurrence_timezone", "occurrence_window", "projection", "utils"
+}
+
+if TYPE_CHECKING:
+    from . import instrumentation
+    from .event import Event
+    from .event_crud import (
+        create_event, create_events, delete_event, delete_events, get_event_by_id, update_event, update_events
+    )
+    from .event_extensions import (
+        Transaction, TransactionSnapshot, get_cash_flow, get_user_cash_flow, get_user_transactions,
+        iter_transaction_batches
+    )
+    from .event_index import DateIndex, EventIndex
+    from .event_set import EventSet
+    from .occurrence_cache import OccurrenceCache
+    from .occurrence_store import OccurrenceStore
+    from .occurrence_window import OccurrenceWindow
+    from .projection import project_users
+    from .utils import get_occurrence_df, iter_occurrence_chunks, iter_occurrences
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    elif name in _SUBMODULES:
+        value = import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
-# Base class
-from event import Event
+    globals()[name] = value  # Later accesses skip __getattr__
+    return value
 
-# Extensions
-from event_extensions import (
-    Transaction,
-    get_user_transactions
-)
 
-# CRUD
-from event_crud import (
-    create_event,
-    update_event,
-    delete_event,
-    get_event_by_id
-)
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | _SUBMODULES)
 
-# Utility functions
-from .utils import get_occurrence_df
 
 __all__ = [
     "Event",
+    "EventIndex",
+    "DateIndex",
+    "EventSet",
+    "OccurrenceStore",
+    "OccurrenceCache",
+    "OccurrenceWindow",
     "Transaction",
+    "TransactionSnapshot",
     "get_user_transactions",
+    "iter_transaction_batches",
+    "get_cash_flow",
+    "get_user_cash_flow",
+    "project_users",
+    "instrumentation",
     "create_event",
     "get_event_by_id",
     "update_event",
-    "delete_event"
+    "delete_event",
+    "create_events",
+    "update_events",
+    "delete_events"
 ]
@@ -0,0 +1,64 @@
+"""
+Async versions of the CRUD functions and `get_user_transactions`.
+Each call runs in its own `async_session_scope()`, so they can be awaited concurrently.
+"""
+from datetime import datetime
+from typing import List, Union
+from sqlalchemy import select
+from sqlalchemy.orm import with_polymorphic
+from .event import Event
+from .event_crud import _notify_changed
+from .event_extensions import TransactionSnapshot, user_transactions_query
+from .async_session import async_session_scope
+from .instrumentation import incr, timer
+
+# Loads subclass columns (e.g. Transaction.amount) up front, since lazy loads can't run outside the session
+_any_event = with_polymorphic(Event, "*")
+
+
+async def create_event(event_obj: Event) -> None:
+    """Stores a new Event (or subclass) in the database."""
+    async with async_session_scope() as session:
+        session.add(event_obj)
+
+
+async def get_event_by_id(event_id: int) -> Union[Event, None]:
+    """Fetches a single event by its ID."""
+    async with async_session_scope() as session:
+        return await session.scalar(select(_any_event).filter_by(id=event_id))
+
+
+async def update_event(event_id: int, updates: dict) -> bool:
+    """Updates fields of an event. Returns True if successful."""
+    async with async_session_scope() as session:
+        event = await session.scalar(select(_any_event).filter_by(id=event_id))
+        if not event:
+            return False
+        for key, value in updates.items():
+            setattr(event, key, value)
+
+    _notify_changed([event_id], updates)
+    return True
+
+
+async def delete_event(event_id: int) -> bool:
+    """Deletes an event by ID. Returns True if deleted."""
+    async with async_session_scope() as session:
+        event = await session.scalar(select(_any_event).filter_by(id=event_id))
+        if not event:
+            return False
+        await session.delete(event)
+
+    _notify_changed([event_id])
+    return True
+
+
+async def get_user_transactions(user_id: str, start: datetime, end: datetime) -> List[TransactionSnapshot]:
+    """Returns user transactions whose active date ranges overlap with the provided period."""
+    with timer("get_user_transactions_async"):
+        async with async_session_scope() as session:
+            result = await session.execute(user_transactions_query(user_id, start, end))
+            transactions = [TransactionSnapshot(*row) for row in result]
+
+    incr("db_rows_fetched", len(transactions))
+    return transactions
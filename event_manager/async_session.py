@@ -0,0 +1,98 @@
+"""
+Asyncio counterpart of db_session, built on SQLAlchemy's AsyncEngine/AsyncSession.
+
+Requires an async driver, e.g. `aiosqlite` for the default SQLite database.
+The engine is only created on first use, so importing this module needs no driver.
+"""
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+from .db_session import DATABASE_URL, _apply_sqlite_pragmas, _check_synchronous, _env_bool, _env_int
+
+ASYNC_DATABASE_URL = os.environ.get(
+    "EVENT_MANAGER_ASYNC_DATABASE_URL",
+    DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+)
+
+# expire_on_commit=False keeps returned objects usable without lazy loads outside the session
+AsyncSessionLocal = async_sessionmaker(expire_on_commit=False)
+
+_engine: Optional[AsyncEngine] = None
+
+
+def init_async_engine(
+        url: Optional[str] = None,
+        *,
+        echo: bool = False,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_pre_ping: bool = False,
+        sqlite_wal: bool = False,
+        sqlite_synchronous: Optional[str] = None
+) -> AsyncEngine:
+    """
+    (Re)creates the async engine used by every async session. Takes the same settings as
+    `db_session.init_engine`. Call `dispose_async_engine()` first when replacing an engine in use.
+
+    :return: The new engine.
+    """
+    global _engine
+
+    sqlite_synchronous = _check_synchronous(sqlite_synchronous)
+
+    options = {"echo": echo, "pool_pre_ping": pool_pre_ping}
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if max_overflow is not None:
+        options["max_overflow"] = max_overflow
+
+    _engine = create_async_engine(url or ASYNC_DATABASE_URL, **options)
+    if _engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(_engine.sync_engine, sqlite_wal, sqlite_synchronous)
+
+    AsyncSessionLocal.configure(bind=_engine)
+
+    return _engine
+
+
+def get_async_engine() -> AsyncEngine:
+    """Returns the async engine, creating it from the environment settings on first use."""
+    if _engine is None:
+        init_async_engine(
+            echo=bool(_env_bool("EVENT_MANAGER_ECHO")),
+            pool_size=_env_int("EVENT_MANAGER_POOL_SIZE"),
+            max_overflow=_env_int("EVENT_MANAGER_MAX_OVERFLOW"),
+            pool_pre_ping=bool(_env_bool("EVENT_MANAGER_POOL_PRE_PING")),
+            sqlite_wal=bool(_env_bool("EVENT_MANAGER_SQLITE_WAL")),
+            sqlite_synchronous=os.environ.get("EVENT_MANAGER_SQLITE_SYNCHRONOUS")
+        )
+    return _engine
+
+
+async def dispose_async_engine() -> None:
+    """Closes every pooled connection of the async engine."""
+    global _engine
+
+    if _engine is not None:
+        await _engine.dispose()
+        _engine = None
+
+
+@asynccontextmanager
+async def async_session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Yields a new AsyncSession and commits it on exit (rolls back on error).
+
+    Every scope owns its session, so concurrent tasks never share one.
+    """
+    get_async_engine()
+    session = AsyncSessionLocal()
+    try:
+        yield session
+        await session.commit()
+    except:
+        await session.rollback()
+        raise
+    finally:
+        await session.close()
@@ -1,17 +1,148 @@
+import os
 from sqlalchemy import create_engine
+from sqlalchemy.event import listens_for
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker
 from contextlib import contextmanager
+from typing import Optional
 
-DATABASE_URL = "sqlite:///events.db"
-engine = create_engine(DATABASE_URL, echo=False)  # echo=True to see queries
-SessionLocal = sessionmaker(bind=engine)
+# Every setting can be overridden through the environment or by calling init_engine().
+DATABASE_URL = os.environ.get("EVENT_MANAGER_DATABASE_URL", "sqlite:///events.db")
+
+
+def _env_int(name: str) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value else None
+
+
+def _env_bool(name: str) -> Optional[bool]:
+    value = os.environ.get(name)
+    return value.lower() in ("1", "true", "yes", "on") if value else None
+
+
+# Accepted values of PRAGMA synchronous
+_SQLITE_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA", "0", "1", "2", "3")
+
+
+def _check_synchronous(synchronous: Optional[str]) -> Optional[str]:
+    """Returns the normalized PRAGMA synchronous value. Raises ValueError for unknown values."""
+    if not synchronous:
+        return None
+
+    value = str(synchronous).strip().upper()
+    if value not in _SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"Invalid SQLite synchronous mode '{synchronous}', expected one of OFF, NORMAL, FULL, EXTRA or 0-3.")
+    return value
+
+
+def _apply_sqlite_pragmas(target_engine: Engine, wal: bool, synchronous: Optional[str]) -> None:
+    """Runs the configured SQLite pragmas on every new connection of the engine."""
+    if not (wal or synchronous):
+        return
+
+    @listens_for(target_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if wal:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        if synchronous:
+            cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.close()
+
+
+def _create_engine(
+        url: str,
+        *,
+        echo: bool = False,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_pre_ping: bool = False,
+        sqlite_wal: bool = False,
+        sqlite_synchronous: Optional[str] = None
+) -> Engine:
+    options = {"echo": echo, "pool_pre_ping": pool_pre_ping}
+    if pool_size is not None:
+        options["pool_size"] = pool_size
+    if max_overflow is not None:
+        options["max_overflow"] = max_overflow
+
+    new_engine = create_engine(url, **options)
+
+    if new_engine.dialect.name == "sqlite":
+        _apply_sqlite_pragmas(new_engine, sqlite_wal, sqlite_synchronous)
+
+    return new_engine
+
+
+def init_engine(
+        url: Optional[str] = None,
+        *,
+        echo: bool = False,
+        pool_size: Optional[int] = None,
+        max_overflow: Optional[int] = None,
+        pool_pre_ping: bool = False,
+        sqlite_wal: bool = False,
+        sqlite_synchronous: Optional[str] = None
+) -> Engine:
+    """
+    (Re)creates the engine used by every session of the module.
+
+    :param url: Database URL. Defaults to DATABASE_URL.
+    :param echo: If True, logs every query.
+    :param pool_size: Number of connections kept in the pool.
+    :param max_overflow: Connections allowed beyond pool_size.
+    :param pool_pre_ping: If True, connections are tested before being used.
+    :param sqlite_wal: SQLite only. Enables the write-ahead log journal mode.
+    :param sqlite_synchronous: SQLite only. Value for PRAGMA synchronous (e.g. "NORMAL", "OFF").
+    :return: The new engine.
+    """
+    global _engine
+
+    sqlite_synchronous = _check_synchronous(sqlite_synchronous)
+
+    old_engine = _engine
+    _engine = _create_engine(
+        url or DATABASE_URL,
+        echo=echo,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=pool_pre_ping,
+        sqlite_wal=sqlite_wal,
+        sqlite_synchronous=sqlite_synchronous
+    )
+    SessionLocal.configure(bind=_engine)
+    if old_engine is not None:
+        old_engine.dispose()
+
+    return _engine
+
+
+def get_engine() -> Engine:
+    """Returns the engine currently in use, creating it from the environment settings on first use."""
+    if _engine is None:
+        init_engine(
+            echo=bool(_env_bool("EVENT_MANAGER_ECHO")),  # True to see queries
+            pool_size=_env_int("EVENT_MANAGER_POOL_SIZE"),
+            max_overflow=_env_int("EVENT_MANAGER_MAX_OVERFLOW"),
+            pool_pre_ping=bool(_env_bool("EVENT_MANAGER_POOL_PRE_PING")),
+            sqlite_wal=bool(_env_bool("EVENT_MANAGER_SQLITE_WAL")),
+            sqlite_synchronous=os.environ.get("EVENT_MANAGER_SQLITE_SYNCHRONOUS")
+        )
+    return _engine
+
+
+# The engine is only created on first use, so importing the module opens no database
+SessionLocal = sessionmaker()
+_engine: Optional[Engine] = None
 
 def get_session():
     """Returns a session ready to be used."""
+    get_engine()
     return SessionLocal()
 
 @contextmanager
 def session_scope():
+    get_engine()
     session = SessionLocal()
     try:
         yield session
@@ -20,4 +151,4 @@ def session_scope():
         session.rollback()
         raise
     finally:
-        session.close()
\ No newline at end of file
+        session.close()
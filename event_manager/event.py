@@ -1,9 +1,10 @@
 import calendar
 import logging
-from datetime import datetime
-from typing import List, Optional, TypedDict
-import pandas as pd
-from sqlalchemy import  Column, Integer, String, DateTime, JSON, Boolean
+from datetime import datetime, timedelta
+from typing import Iterable, Iterator, List, NamedTuple, Optional, TypedDict
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import  BigInteger, Column, Integer, String, DateTime, JSON, Boolean, Index
+from sqlalchemy.event import listen
 from sqlalchemy.ext.declarative import declarative_base
 
 Base = declarative_base()
@@ -16,7 +17,218 @@ class EventDict(TypedDict):
     interval: int
     days: List[int]
 
-class Event(Base):
+# Fields that define when an event occurs
+RECURRENCE_FIELDS = ("start_date", "end_date", "recurrent_type", "interval", "days", "use_last_day", "timezone")
+
+def get_zone(name: str) -> ZoneInfo:
+    """Returns the zone of an IANA name (e.g. "Europe/Paris"). Raises ValueError for unknown names."""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValueError(f"Unknown timezone '{name}'.") from None
+
+def day_mask(days: Iterable[int]) -> int:
+    """Bitmask of a list of days, with the RecurrenceRule layout (bit n set for day n)."""
+    mask = 0
+    for day in days or ():
+        mask |= 1 << day
+    return mask
+
+class RecurrenceRule(NamedTuple):
+    """
+    Immutable, precompiled recurrence of an event.
+
+    Days are stored as bitmasks so checking a date takes a few integer operations.
+    Built lazily by `Event.rule` and discarded whenever a recurrence field of the event changes.
+    """
+    weekly: bool
+    start_date: datetime
+    end_date: Optional[datetime]
+    interval: int
+    weekday_mask: int  # Bit n is set when the event occurs on weekday n (0 = Monday)
+    day_mask: int  # Bit n is set when the event occurs on day n of the month
+    max_day: int  # Latest day of the month, clamped to the last day when use_last_day is set
+    use_last_day: bool
+    start_month: int  # start_date as a number of months, to compute monthly intervals
+    timezone: Optional[str]  # Zone of the stored wall times, used to convert aware dates
+
+    @classmethod
+    def compile(cls, event: "RecurrenceMixin") -> "RecurrenceRule":
+        """Builds the rule from the current fields of an event."""
+        days = event.days or []
+        mask = day_mask(days)
+
+        weekly = event.recurrent_type == "weekly"
+        return cls(
+            weekly=weekly,
+            start_date=event.start_date,
+            end_date=event.end_date,
+            interval=event.interval,
+            weekday_mask=mask if weekly else 0,
+            day_mask=0 if weekly else mask,
+            max_day=max(days, default=0),
+            use_last_day=bool(event.use_last_day),
+            start_month=event.start_date.year * 12 + event.start_date.month,
+            timezone=getattr(event, "timezone", None)
+        )
+
+    def occurs_on(self, date: datetime) -> bool:
+        """
+        Checks if the rule produces an occurrence on the given date. Aware dates are converted to
+        the wall time of the event timezone (events without timezone use their wall time as is).
+        """
+        if date.tzinfo is not None:
+            if self.timezone is not None:
+                date = date.astimezone(get_zone(self.timezone))
+            date = date.replace(tzinfo=None)
+
+        if date < self.start_date or (self.end_date is not None and date > self.end_date):
+            return False  # Outside valid date range
+
+        if self.weekly:
+            if not self.weekday_mask >> date.weekday() & 1:
+                return False
+            return self.interval == 1 or (date - self.start_date).days // 7 % self.interval == 0
+
+        if self.interval != 1 and (date.year * 12 + date.month - self.start_month) % self.interval:
+            return False  # The month does not match the interval
+
+        day = date.day
+        if self.day_mask >> day & 1:
+            return True
+
+        # Days beyond the end of the month fall on its last day when use_last_day is enabled
+        return (
+            self.use_last_day and self.max_day > day >= 28
+            and day == calendar.monthrange(date.year, date.month)[1]
+        )
+
+class RecurrenceMixin:
+    """
+    Recurrence behaviour shared by Event and its lightweight, non-ORM snapshots.
+
+    Subclasses provide the start_date, end_date, recurrent_type, interval, days
+    and use_last_day attributes, and may store the compiled rule in `_rule`.
+    """
+    __slots__ = ()
+
+    def get_occurrences(self, start_date: datetime, end_date: datetime):
+        if not self.occurs_on_range(start_date, end_date):
+            logging.debug("Event %s does not occur on the given date range", self.name)
+            return []  # Returning an empty list is more predictable than None
+
+        return list(self.iter_occurrences(start_date, end_date))
+
+    def iter_occurrences(self, start_date: datetime, end_date: datetime) -> Iterator[datetime]:
+        """
+        Lazily yields every date the event occurs on between start_date and end_date (inclusive).
+
+        Dates are produced in chronological order by jumping straight from one occurrence to the next,
+        so the cost grows with the number of occurrences instead of the number of days in the range.
+        Every yielded date keeps the time of day of start_date, exactly like a daily scan would.
+        """
+        if not self.occurs_on_range(start_date, end_date):
+            return iter(())
+
+        if self.recurrent_type == "weekly":
+            return self._iter_weekly(start_date, end_date)
+
+        if self.recurrent_type == "monthly":
+            return self._iter_monthly(start_date, end_date)
+
+        return iter(())
+
+    def _iter_weekly(self, start_date: datetime, end_date: datetime) -> Iterator[datetime]:
+        """Yields weekly occurrences, skipping whole blocks of weeks that don't match the interval."""
+        limit = end_date if self.end_date is None else min(end_date, self.end_date)
+
+        # k is the number of days after start_date, the same step a daily date_range would take.
+        k = 0
+        if start_date < self.start_date:
+            k = -((start_date - self.start_date) // timedelta(days=1))  # Ceil to the first day on/after start
+
+        base = (start_date - self.start_date).days  # Days since the event start for k = 0
+        first_weekday = (start_date.weekday() - base) % 7  # Weekday of the day with a delta of 0
+
+        # Offsets inside a 7-day block (anchored at the event start) that land on one of the event days
+        weekday_mask = self.rule.weekday_mask
+        offsets = [j for j in range(7) if weekday_mask >> ((first_weekday + j) % 7) & 1]
+        if not offsets:
+            return
+
+        first = base + k
+        block = first // 7
+        block += -block % self.interval  # First 7-day block aligned with the interval
+
+        while True:
+            for offset in offsets:
+                delta = block * 7 + offset
+                if delta < first:
+                    continue
+                try:
+                    day = start_date + timedelta(days=delta - base)
+                except OverflowError:
+                    return  # Past datetime.max, e.g. open-ended events streamed without an end
+                if day > limit:
+                    return
+                yield day
+            block += self.interval
+
+    def _iter_monthly(self, start_date: datetime, end_date: datetime) -> Iterator[datetime]:
+        """Yields monthly occurrences by walking the matching months, clamping days when use_last_day is set."""
+        limit = end_date if self.end_date is None else min(end_date, self.end_date)
+        lower = max(start_date, self.start_date)
+
+        anchor = self.start_date.year * 12 + self.start_date.month - 1
+        month = max(start_date.year * 12 + start_date.month - 1, anchor)
+        month += (anchor - month) % self.interval  # Align with the event interval
+        last_month = limit.year * 12 + limit.month - 1
+
+        while month <= last_month:
+            year, month_index = divmod(month, 12)
+            last_day = calendar.monthrange(year, month_index + 1)[1]
+
+            if self.use_last_day:
+                month_days = sorted({min(day, last_day) for day in self.days})
+            else:
+                month_days = sorted(day for day in set(self.days) if day <= last_day)
+
+            for day in month_days:
+                date = start_date.replace(year=year, month=month_index + 1, day=day)
+                if date > limit:
+                    return
+                if date >= lower:
+                    yield date
+
+            month += self.interval
+
+    @property
+    def rule(self) -> "RecurrenceRule":
+        """The compiled recurrence rule, rebuilt on first use after a recurrence field changes."""
+        rule = getattr(self, "_rule", None)
+        if rule is None:
+            rule = self._rule = RecurrenceRule.compile(self)
+        return rule
+
+    def invalidate_rule(self) -> None:
+        """
+        Discards the compiled rule. Assigning a recurrence field does this automatically;
+        call it after mutating `days` in place.
+        """
+        self._rule = None
+
+    def occurs_on(self, date: datetime) -> bool:
+        """Checks if the event occurs on the given date."""
+        return self.rule.occurs_on(date)
+
+    def occurs_on_range(self, start_date: datetime, end_date: datetime) -> bool:
+        """
+        Check if the event could happen between the given dates. Meant for time ranges bigger than the interval.
+        """
+
+        return self.start_date <= end_date and (self.end_date is None or self.end_date >= start_date)
+
+class Event(RecurrenceMixin, Base):
     __tablename__ = "events"
 
     id = Column(Integer, primary_key=True)
@@ -26,14 +238,21 @@ class Event(Base):
     recurrent_type = Column(String(20))  # 'weekly' or 'monthly'
     interval = Column(Integer, default=1)
     days = Column(JSON, default=list)
+    days_mask = Column(BigInteger, default=0)  # day_mask(days), kept in sync on flush for SQL pre-filtering
     event_type = Column(String(50))  # Defines whether it's an 'event' or 'transaction'
     use_last_day = Column(Boolean, default=False)
+    timezone = Column(String(64), nullable=True)  # IANA name; the dates are local wall times in this zone
 
     __mapper_args__ = {
         "polymorphic_identity": "event",
         "polymorphic_on": event_type
     }
 
+    # Range queries filter on the subclass and the active dates
+    __table_args__ = (
+        Index("ix_events_type_range", "event_type", "start_date", "end_date"),
+    )
+
     def __init__(
         self, *,
         name: str,
@@ -43,6 +262,7 @@ class Event(Base):
         interval: int = 1,
         days: Optional[List[int]] = None,
         use_last_day: Optional[bool] = False,
+        timezone: Optional[str] = None,
         subclass: str = "event"
     ):
         """
@@ -57,6 +277,7 @@ class Event(Base):
                       - For weekly events: integers 0–6 (0 = Monday, 6 = Sunday).
                       - For monthly events: integers 1–31 representing days of the month.
         :param use_last_day: If True, the event will also occur on the last day of the month (when applicable).
+        :param timezone: Optional IANA timezone the event recurs in. Dates stay naive local wall times.
         :param subclass: Internal use for subclass identity in polymorphic inheritance (e.g., "transaction").
         """
 
@@ -79,6 +300,9 @@ class Event(Base):
         if end_date and end_date < start_date:
             raise ValueError("End date must be after start date.")
 
+        if timezone is not None:
+            get_zone(timezone)
+
         # Initial Values
         self.name = name
         self.start_date = start_date
@@ -87,73 +311,10 @@ class Event(Base):
         self.interval = interval
         self.days = days if days is not None else [start_date.weekday()]
         self.use_last_day = use_last_day
+        self.timezone = timezone
         self.event_type = subclass
 
 
-    def get_occurrences(self, start_date: datetime, end_date: datetime):
-        if not self.occurs_on_range(start_date, end_date):
-            logging.debug(f"Event {self.name} does not occur on the given date range")
-            return []  # Returning an empty list is more predictable than None
-
-        return [date for date in pd.date_range(start=start_date, end=end_date) if self.occurs_on(date)]
-
-    def occurs_on(self, date: datetime) -> bool:
-        """Checks if the event occurs on the given date."""
-
-        if self.start_date > date or (self.end_date and self.end_date < date):
-            return False  # Outside valid date range
-
-        if self.recurrent_type == "weekly":
-            return date.weekday() in self.days and self._matches_weekly_interval(date)
-
-        if self.recurrent_type == "monthly":
-
-            if not self._matches_monthly_interval(date):
-                return False  # The month does not match the interval
-
-            last_day = calendar.monthrange(date.year, date.month)[1]  # Get last valid day of the month
-
-            # Adjust event days based on `use_last_day`
-            valid_days = [
-                day if day <= last_day else last_day  # Ensure days don't exceed the last day of the current month.
-                for day in self.days  # Iterate through the specified days for this month.
-            ] if self.use_last_day else self.days  # Use `last_day` adjustments only if `use_last_day` is enabled.
-
-            return date.day in valid_days  # Check if the current day is within the valid days of the month.
-
-        return False
-
-    def _matches_weekly_interval(self, date: datetime) -> bool:
-        """Checks if the date falls within the correct weekly
-        interval."""
-        logging.debug(f"=> Getting match for weekly interval on {date.strftime('%Y-%m-%d')} ({date.weekday()})")
-
-        delta_days = (date - self.start_date).days
-        weeks_since_start = delta_days // 7
-        interval_mod = weeks_since_start % self.interval
-
-        logging.debug(f"=> Delta days: {delta_days} | Weeks since start: {weeks_since_start} |Mod:  {interval_mod} {interval_mod == 0}")
-
-        return interval_mod == 0
-
-    def _matches_monthly_interval(self, date: datetime) -> bool:
-        """Checks if the date falls within the correct monthly interval."""
-        logging.debug(f"=> Getting match for monthly interval on {date.strftime('%Y-%m-%d')} ({date.weekday()})")
-
-        months_since_start = (date.year - self.start_date.year) * 12 + (date.month - self.start_date.month)
-        interval_mod = months_since_start % self.interval
-
-        logging.debug(f"=> Weeks since start: {months_since_start} |Mod:  {interval_mod} {interval_mod == 0}")
-
-        return interval_mod == 0
-
-    def occurs_on_range(self, start_date: datetime, end_date: datetime) -> bool:
-        """
-        Check if the event could happen between the given dates. Meant for time ranges bigger than the interval.
-        """
-
-        return self.start_date <= end_date and (self.end_date is None or self.end_date >= start_date)
-
     def __str__(self):
         return (
             f"Event(name={self.name}, recurrent_type={self.recurrent_type}, "
@@ -161,3 +322,21 @@ class Event(Base):
             f"end_date={'None' if not self.end_date else self.end_date.strftime('%Y-%m-%d')}, "
             f"days={self.days})"
         )
+
+
+def _invalidate_rule(target: Event, *args) -> None:
+    target.invalidate_rule()
+
+# Drop the compiled rule whenever a field it depends on is assigned, refreshed or expired
+for _field in RECURRENCE_FIELDS:
+    listen(getattr(Event, _field), "set", _invalidate_rule, propagate=True)
+
+listen(Event, "refresh", _invalidate_rule, propagate=True)
+listen(Event, "expire", _invalidate_rule, propagate=True)
+
+
+def _sync_days_mask(mapper, connection, target: Event) -> None:
+    target.days_mask = day_mask(target.days)
+
+listen(Event, "before_insert", _sync_days_mask, propagate=True)
+listen(Event, "before_update", _sync_days_mask, propagate=True)
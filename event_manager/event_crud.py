@@ -1,19 +1,65 @@
-from typing import Union
-from event import Event
-from db_session import session_scope
+import weakref
+from typing import Callable, FrozenSet, Iterable, Iterator, List, Optional, Union
+from sqlalchemy import delete, update
+from .event import Event, day_mask
+from .db_session import session_scope
+from .instrumentation import timed
+from . import event_extensions  # Registers the Transaction mapper, so polymorphic loads return Transactions
 
+# Rows per statement for the batch functions. Keeps `IN (...)` lists under SQLite's variable limit.
+DEFAULT_BATCH_SIZE = 500
+
+# Callbacks notified with the ID of every updated or deleted event
+_change_listeners = []
+
+# Called with (event ID, names of the updated fields), or (event ID, None) when the event was deleted
+ChangeListener = Callable[[int, Optional[FrozenSet[str]]], None]
+
+
+def add_change_listener(callback: ChangeListener) -> None:
+    """
+    Registers a callback called after an event is updated, with the event ID and the names of the
+    updated fields, or after it is deleted, with the event ID and None. Bound methods are held
+    weakly, so their owners can be collected.
+    """
+    if hasattr(callback, "__self__"):
+        _change_listeners.append(weakref.WeakMethod(callback))
+    else:
+        _change_listeners.append(lambda: callback)
+
+
+def remove_change_listener(callback: ChangeListener) -> None:
+    """Unregisters a callback added with add_change_listener."""
+    _change_listeners[:] = [ref for ref in _change_listeners if ref() not in (None, callback)]
+
+
+def _notify_changed(event_ids: Iterable[int], updates: Optional[dict] = None) -> None:
+    """Calls the change listeners for deleted events (updates=None) or updated ones."""
+    if not _change_listeners:
+        return
+
+    fields = None if updates is None else frozenset(updates)
+    callbacks = [ref() for ref in _change_listeners]
+    for event_id in event_ids:
+        for callback in callbacks:
+            if callback is not None:
+                callback(event_id, fields)
+
+@timed("create_event")
 def create_event(event_obj: Event) -> None:
     """Stores a new Event (or subclass) in the database."""
     with session_scope() as session:
         session.add(event_obj)
 
 
+@timed("get_event_by_id")
 def get_event_by_id(event_id: int) -> Union[Event, None]:
     """Fetches a single event by its ID."""
     with session_scope() as session:
         return session.query(Event).filter_by(id=event_id).first()
 
 
+@timed("update_event")
 def update_event(event_id: int, updates: dict) -> bool:
     """Updates fields of an event. Returns True if successful."""
     with session_scope() as session:
@@ -22,9 +68,12 @@ def update_event(event_id: int, updates: dict) -> bool:
             return False
         for key, value in updates.items():
             setattr(event, key, value)
-        return True
 
+    _notify_changed([event_id], updates)
+    return True
 
+
+@timed("delete_event")
 def delete_event(event_id: int) -> bool:
     """Deletes an event by ID. Returns True if deleted."""
     with session_scope() as session:
@@ -32,4 +81,72 @@ def delete_event(event_id: int) -> bool:
         if not event:
             return False
         session.delete(event)
-        return True
+
+    _notify_changed([event_id])
+    return True
+
+
+@timed("create_events")
+def create_events(event_objs: Iterable[Event], batch_size: int = DEFAULT_BATCH_SIZE) -> List[int]:
+    """
+    Stores many Events (or subclasses) in a single transaction.
+    Rows are flushed batch_size at a time as multi-row INSERT statements.
+
+    :return: Number of rows inserted by each batch.
+    """
+    with session_scope() as session:
+        counts = []
+        for batch in _batches(list(event_objs), batch_size):
+            session.add_all(batch)
+            session.flush()
+            counts.append(len(batch))
+        return counts
+
+
+@timed("update_events")
+def update_events(event_ids: Iterable[int], updates: dict, batch_size: int = DEFAULT_BATCH_SIZE) -> List[int]:
+    """
+    Applies the same field updates to many events in a single transaction,
+    with one `UPDATE ... WHERE id IN (...)` per batch and no prior SELECT.
+    Subclass columns (e.g. a Transaction `amount`) can be updated as well.
+
+    :return: Number of rows updated by each batch.
+    """
+    table = Event.__table__
+    event_ids = list(event_ids)
+    values = {**updates, "days_mask": day_mask(updates["days"])} if "days" in updates else updates  # No flush hook here
+    with session_scope() as session:
+        counts = []
+        for batch in _batches(event_ids, batch_size):
+            result = session.execute(update(table).where(table.c.id.in_(batch)).values(values))
+            counts.append(result.rowcount)
+
+    _notify_changed(event_ids, updates)
+    return counts
+
+
+@timed("delete_events")
+def delete_events(event_ids: Iterable[int], batch_size: int = DEFAULT_BATCH_SIZE) -> List[int]:
+    """
+    Deletes many events in a single transaction, with one `DELETE ... WHERE id IN (...)` per batch.
+
+    :return: Number of rows deleted by each batch.
+    """
+    table = Event.__table__
+    event_ids = list(event_ids)
+    with session_scope() as session:
+        counts = []
+        for batch in _batches(event_ids, batch_size):
+            result = session.execute(delete(table).where(table.c.id.in_(batch)))
+            counts.append(result.rowcount)
+
+    _notify_changed(event_ids)
+    return counts
+
+
+def _batches(items: list, batch_size: int) -> Iterator[list]:
+    if batch_size < 1:
+        raise ValueError("Batch size must be a positive integer.")
+
+    for i in range(0, len(items), batch_size):
+        yield items[i:i + batch_size]
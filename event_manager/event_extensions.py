@@ -1,9 +1,16 @@
-from sqlalchemy import Column, Float, String
-from datetime import datetime
-from typing import List
-from sqlalchemy import or_
-from db_session import session_scope
-from event import Event
+from sqlalchemy import Column, Float, Index, String
+import calendar
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import ColumnElement, Select, and_, false, or_, select, true, tuple_
+from .db_session import session_scope
+from .event import Event, RecurrenceMixin, day_mask
+from .instrumentation import incr, timed
+
+if TYPE_CHECKING:
+    # NumPy and pandas are only imported by the cash-flow functions, so validating rules doesn't load them
+    import numpy as np
+    import pandas as pd
 
 # Example of extension
 class Transaction(Event):
@@ -27,7 +34,8 @@ class Transaction(Event):
             transaction_type: str,
             user_id: str,
             end_date=None,
-            use_last_day=False
+            use_last_day=False,
+            timezone=None
     ):
 
         super().__init__(
@@ -38,6 +46,7 @@ class Transaction(Event):
             interval=interval,
             days=days,
             use_last_day=use_last_day,
+            timezone=timezone,
             subclass="transaction"
         )
 
@@ -64,40 +73,334 @@ class Transaction(Event):
         return f"{self.transaction_type.capitalize()} - {self.name}: ${self.amount}"
 
 
+# Transactions are stored in the events table, so their per-user indexes are declared here
+Index("ix_events_user_range", Transaction.user_id, Transaction.start_date, Transaction.end_date)
+Index("ix_events_user_id", Transaction.user_id, Transaction.id)  # Keyset pagination order
+
+
+class TransactionSnapshot(RecurrenceMixin):
+    """
+    Lightweight, read-only copy of a stored Transaction.
+
+    Holds only the column values (no ORM state or validation), and supports the same
+    occurrence methods as Event, so it can be passed to the functions in `utils`.
+    """
+    __slots__ = (
+        "id", "name", "start_date", "end_date", "recurrent_type", "interval", "days",
+        "use_last_day", "amount", "transaction_type", "user_id", "timezone", "_rule"
+    )
+
+    event_type = "transaction"
+
+    def __init__(
+            self,
+            id: int,
+            name: str,
+            start_date: datetime,
+            end_date: Optional[datetime],
+            recurrent_type: str,
+            interval: int,
+            days: List[int],
+            use_last_day: bool,
+            amount: float,
+            transaction_type: str,
+            user_id: str,
+            timezone: Optional[str] = None
+    ):
+        self.id = id
+        self.name = name
+        self.start_date = start_date
+        self.end_date = end_date
+        self.recurrent_type = recurrent_type
+        self.interval = interval
+        self.days = days
+        self.use_last_day = use_last_day
+        self.amount = amount
+        self.transaction_type = transaction_type
+        self.user_id = user_id
+        self.timezone = timezone
+        self._rule = None
+
+    def __repr__(self):
+        return (f"<TransactionSnapshot(id={self.id}, name='{self.name}', type='{self.transaction_type}', "
+                f"amount={self.amount}, user_id={self.user_id}, start={self.start_date}, "
+                f"recurrence='{self.recurrent_type}')>")
+
+    def __str__(self):
+        return f"{self.transaction_type.capitalize()} - {self.name}: ${self.amount}"
+
+
+# Columns loaded for each TransactionSnapshot, in constructor order
+SNAPSHOT_COLUMNS = (
+    Transaction.id,
+    Transaction.name,
+    Transaction.start_date,
+    Transaction.end_date,
+    Transaction.recurrent_type,
+    Transaction.interval,
+    Transaction.days,
+    Transaction.use_last_day,
+    Transaction.amount,
+    Transaction.transaction_type,
+    Transaction.user_id,
+    Transaction.timezone
+)
+
+
+def user_transactions_query(user_id: str, start: datetime, end: datetime) -> Select:
+    """Builds the snapshot query for user transactions overlapping the provided period."""
+    return select(*SNAPSHOT_COLUMNS).where(
+        Transaction.user_id == user_id,
+        Transaction.start_date <= end,
+        or_(
+            Transaction.end_date == None,
+            Transaction.end_date >= start
+        )
+    )
+
+
+def users_transactions_query(user_ids: Sequence[str], start: datetime, end: datetime) -> Select:
+    """Builds the snapshot query for the transactions of several users, ordered by user and ID."""
+    return select(*SNAPSHOT_COLUMNS).where(
+        Transaction.user_id.in_(user_ids),
+        Transaction.start_date <= end,
+        or_(
+            Transaction.end_date == None,
+            Transaction.end_date >= start
+        )
+    ).order_by(Transaction.user_id, Transaction.id)
+
+
+# Windows of at least this many days hit every weekday / every day of the month, so they aren't pre-filtered
+_FULL_WEEK_DAYS = 7
+_FULL_MONTH_DAYS = 62
+
 
-def get_user_transactions(user_id: str, start: datetime, end: datetime) -> List[Transaction]:
+def recurrence_filter(start: datetime, end: datetime) -> ColumnElement:
+    """
+    Builds a SQL predicate keeping only the events whose days can fall between start and end, using
+    the stored days_mask. Meant for short windows (a day or a week); longer windows keep every event.
+
+    Weekly events need one of the weekdays of the window. Monthly events need one of its days of the
+    month, or use_last_day with a day past the end of a month ending in the window. Interval phases
+    aren't checked, so the predicate may still keep events without occurrences in the window.
+    """
+    first, last = start.date(), end.date()
+    if last < first:
+        return false()
+
+    span = (last - first).days + 1
+    dates = [first + timedelta(days=i) for i in range(min(span, _FULL_MONTH_DAYS))]
+
+    if span >= _FULL_WEEK_DAYS:
+        weekly = true()
+    else:
+        weekly = Event.days_mask.op("&")(day_mask(date.weekday() for date in dates)) != 0
+
+    if span >= _FULL_MONTH_DAYS:
+        monthly = true()
+    else:
+        monthly = Event.days_mask.op("&")(day_mask(date.day for date in dates)) != 0
+        month_ends = [date.day for date in dates if date.day == calendar.monthrange(date.year, date.month)[1]]
+        if month_ends:
+            # Any day past the shortest month end in the window is clamped onto it
+            monthly = or_(monthly, and_(Event.use_last_day == True, Event.days_mask >= 1 << (min(month_ends) + 1)))
+
+    return or_(
+        Event.days_mask == None,  # Rows stored before the column existed
+        and_(Event.recurrent_type == "weekly", weekly),
+        and_(Event.recurrent_type == "monthly", monthly)
+    )
+
+
+def occurring_transactions_query(user_id: Optional[str], start: datetime, end: datetime) -> Select:
+    """
+    Builds the snapshot query for the transactions (of a user, or of every user when user_id is None)
+    overlapping the period and passing `recurrence_filter`.
+    """
+    query = select(*SNAPSHOT_COLUMNS).where(
+        Transaction.start_date <= end,
+        or_(
+            Transaction.end_date == None,
+            Transaction.end_date >= start
+        ),
+        recurrence_filter(start, end)
+    )
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+
+    return query
+
+
+@timed("get_user_transactions")
+def get_user_transactions(user_id: str, start: datetime, end: datetime, occurring_only: bool = False) -> List[TransactionSnapshot]:
     """
     Returns user transactions whose active date ranges overlap with the provided period.
+
+    Only the needed columns are selected and each row becomes a detached TransactionSnapshot,
+    skipping ORM object loading and Transaction validation.
+
+    :param occurring_only: If True, only returns the transactions with at least one occurrence in the
+                           period. Weekdays and days of the month are pre-filtered in SQL, so short
+                           periods fetch far fewer rows.
     """
+    if occurring_only:
+        query = occurring_transactions_query(user_id, start, end)
+    else:
+        query = user_transactions_query(user_id, start, end)
+
     with session_scope() as session:
-        txs = session.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.start_date <= end,
-            or_(
-                Transaction.end_date == None,
-                Transaction.end_date >= start
-            )
-        ).all()
-
-        # Create independent copies of transactions with the original ID
-        detached = []
-        for tx in txs:
-            new_tx = Transaction(
-                name=tx.name,
-                start_date=tx.start_date,
-                end_date=tx.end_date,
-                recurrent_type=tx.recurrent_type,
-                interval=tx.interval,
-                days=tx.days,
-                use_last_day=tx.use_last_day,
-                transaction_type=tx.transaction_type,
-                amount=tx.amount,
-                user_id=tx.user_id
-            )
-            new_tx.id = tx.id  # Preserve original database ID
-            detached.append(new_tx)
-
-        print("Preloaded: ", [(tx.name, tx.start_date) for tx in txs])
-
-        return detached
+        transactions = [TransactionSnapshot(*row) for row in session.execute(query)]
+
+    incr("db_rows_fetched", len(transactions))
+
+    if occurring_only:
+        transactions = [t for t in transactions if next(t.iter_occurrences(start, end), None) is not None]
+
+    return transactions
+
+
+# Rows per batch yielded by iter_transaction_batches, and per keyset-paginated query
+DEFAULT_STREAM_BATCH_SIZE = 1000
+DEFAULT_STREAM_PAGE_SIZE = 50000
+
+
+def transactions_page_query(start: datetime, end: datetime, after: Optional[Tuple[str, int]], limit: int) -> Select:
+    """Builds the query for the next page of transactions overlapping the period, ordered by (user_id, id)."""
+    query = select(*SNAPSHOT_COLUMNS).where(
+        Transaction.start_date <= end,
+        or_(
+            Transaction.end_date == None,
+            Transaction.end_date >= start
+        )
+    )
+    if after is not None:
+        query = query.where(tuple_(Transaction.user_id, Transaction.id) > tuple_(*after))
+
+    return query.order_by(Transaction.user_id, Transaction.id).limit(limit)
+
+
+def iter_transaction_batches(
+        start: datetime,
+        end: datetime,
+        batch_size: int = DEFAULT_STREAM_BATCH_SIZE,
+        page_size: int = DEFAULT_STREAM_PAGE_SIZE,
+        after: Optional[Tuple[str, int]] = None
+) -> Iterator[List[TransactionSnapshot]]:
+    """
+    Streams the transactions of every user overlapping the period, ordered by (user_id, id).
+
+    Rows are read with keyset pagination: each page is a separate query resuming after the last
+    (user_id, id) seen, so no query runs for the whole scan and every page is an index seek. Pages
+    are fetched batch_size rows at a time (yield_per), so only one batch is held in memory.
+
+    :param start: Start of the date range.
+    :param end: End of the date range.
+    :param batch_size: Maximum number of snapshots per batch. A user may span several batches.
+    :param page_size: Rows read by each query.
+    :param after: Optional (user_id, id) key to resume a previous scan after.
+    :return: Iterator of TransactionSnapshot lists, ready for `get_occurrence_df` or `EventSet.from_events`.
+    """
+    if batch_size < 1 or page_size < 1:
+        raise ValueError("Batch and page sizes must be positive integers.")
+
+    while True:
+        query = transactions_page_query(start, end, after, page_size).execution_options(yield_per=batch_size)
+        fetched = 0
+
+        with session_scope() as session:
+            for rows in session.execute(query).partitions():
+                batch = [TransactionSnapshot(*row) for row in rows]
+                fetched += len(batch)
+                after = (batch[-1].user_id, batch[-1].id)
+                incr("db_rows_fetched", len(batch))
+                yield batch
+
+        if fetched < page_size:
+            return
+
+
+CASH_FLOW_COLUMNS = ["income", "expense", "savings", "net", "balance"]
+
+# Period name => datetime64 unit of the period starts
+_CASH_FLOW_PERIODS = {
+    "day": "D",
+    "week": "W",
+    "month": "M",
+    "year": "Y"
+}
+
+
+@timed("get_cash_flow")
+def get_cash_flow(
+        transactions: Sequence[RecurrenceMixin],
+        start: datetime,
+        end: datetime,
+        period: str = "month",
+        opening_balance: float = 0.0,
+        chunk_size: int = 10000
+) -> "pd.DataFrame":
+    """
+    Returns the income, expense and savings totals of each period, with the net amount and running balance.
+
+    Occurrences are counted per period directly from the recurrence rules (e.g. "this weekly rule
+    hits 4 times in March"), so no per-occurrence row is ever built. The totals match grouping the
+    output of `get_occurrence_df` by period and transaction type.
+
+    :param transactions: Transactions (or TransactionSnapshots) to aggregate.
+    :param start: Start of the date range.
+    :param end: End of the date range.
+    :param period: One of "day", "week" (starting on Monday), "month" or "year".
+    :param opening_balance: Balance before the first period.
+    :param chunk_size: Transactions counted at once, to bound the memory used.
+    :return: DataFrame indexed by period start, with the columns in CASH_FLOW_COLUMNS.
+             net is income minus expense and savings; balance is the cumulative net.
+    """
+    import numpy as np
+    import pandas as pd
+    from .occurrence_engine import count_occurrences
+
+    if period not in _CASH_FLOW_PERIODS:
+        raise ValueError(f"Period must be one of {', '.join(_CASH_FLOW_PERIODS)}.")
+
+    if chunk_size < 1:
+        raise ValueError("Chunk size must be a positive integer.")
+
+    bounds = _period_bounds(start, end, period)
+    totals = {transaction_type: np.zeros(len(bounds) - 1) for transaction_type in ("income", "expense", "savings")}
+
+    for i in range(0, len(transactions), chunk_size):
+        chunk = transactions[i:i + chunk_size]
+        counts = count_occurrences(chunk, start, end, bounds)
+        amounts = np.array([t.amount for t in chunk], dtype=float)
+        types = np.array([t.transaction_type for t in chunk], dtype=object)
+
+        for transaction_type, total in totals.items():
+            selected = types == transaction_type
+            total += amounts[selected] @ counts[selected]
+
+    df = pd.DataFrame(totals, index=pd.DatetimeIndex(bounds[:-1], name="period"))
+    df["net"] = df["income"] - df["expense"] - df["savings"]
+    df["balance"] = opening_balance + df["net"].cumsum()
+
+    return df[CASH_FLOW_COLUMNS]
+
+
+def get_user_cash_flow(user_id: str, start: datetime, end: datetime, period: str = "month", opening_balance: float = 0.0) -> "pd.DataFrame":
+    """Same as `get_cash_flow`, for the transactions of a user overlapping the period."""
+    return get_cash_flow(get_user_transactions(user_id, start, end), start, end, period, opening_balance)
+
+
+def _period_bounds(start: datetime, end: datetime, period: str) -> "np.ndarray":
+    """Returns the start of every period between start and end, plus the start of the following period."""
+    import numpy as np
+
+    unit = _CASH_FLOW_PERIODS[period]
+    first = np.datetime64(start, "D")
+    last = np.datetime64(end, "D")
+
+    if unit == "W":
+        first = first - ((first.astype(np.int64) + 3) % 7)  # Monday of the week (1970-01-01 was a Thursday)
+        return np.arange(first, last + 8, 7)
 
+    return np.arange(first.astype(f"datetime64[{unit}]"), last.astype(f"datetime64[{unit}]") + 2).astype("datetime64[D]")
@@ -0,0 +1,336 @@
+"""
+Indexes over a list of events.
+
+`EventIndex` answers "which events are active between start and end" without touching every event.
+Events are kept sorted by start date in an implicit augmented interval tree: the array itself is the
+in-order layout of a balanced binary tree, and every node stores the latest end date of its subtree,
+so whole subtrees that end before the query can be skipped.
+
+`DateIndex` answers "which events occur on date D": rules are bucketed by the dates they can match
+(weekday and interval phase, or day of month and month phase), so a lookup only checks the events
+of the matching buckets.
+"""
+import calendar
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from .event import Event
+
+_OPEN_END = datetime.max  # End date used for events that continue indefinitely
+
+# Pending inserts/removals are merged into the tree once they exceed this share of its size
+_REBUILD_RATIO = 8
+_MIN_PENDING = 64
+
+
+class EventIndex:
+    """
+    Index of events by active date range, built once and updated incrementally.
+
+    Queries cost O(log n + k) for k matching events. Inserts and removals are buffered and merged
+    into the tree once the buffer grows past a fraction of the index, keeping updates cheap.
+    """
+
+    def __init__(self, events: Iterable[Event] = ()):
+        """
+        :param events: Events (or subclasses) to index.
+        """
+        self._events: List[Event] = []
+        self._starts: List[datetime] = []
+        self._ends: List[datetime] = []
+        self._max_ends: List[datetime] = []
+        self._max_level = -1
+
+        self._members = {}  # id(event) => event, for every event currently in the index
+        self._pending: List[Event] = []  # Inserted after the last rebuild
+        self._removed = set()  # ids of tree events removed after the last rebuild
+
+        for event in events:
+            self._members[id(event)] = event
+
+        self._rebuild()
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, event: Event) -> bool:
+        return id(event) in self._members
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(list(self._members.values()))
+
+    def add(self, event: Event) -> None:
+        """Adds an event to the index. Adding an event that is already indexed has no effect."""
+        key = id(event)
+        if key in self._members:
+            return
+
+        self._members[key] = event
+        if key in self._removed:
+            self._removed.discard(key)  # Still stored in the tree, just make it visible again
+        else:
+            self._pending.append(event)
+
+        self._rebuild_if_needed()
+
+    def remove(self, event: Event) -> bool:
+        """Removes an event from the index. Returns True if it was indexed."""
+        key = id(event)
+        if self._members.pop(key, None) is None:
+            return False
+
+        for i, pending in enumerate(self._pending):
+            if pending is event:
+                del self._pending[i]
+                break
+        else:
+            self._removed.add(key)
+
+        self._rebuild_if_needed()
+        return True
+
+    def refresh(self, event: Event) -> None:
+        """Re-indexes an event after its start_date or end_date changed."""
+        self.remove(event)
+        self.add(event)
+
+    # start_date, end_date | datetime => events | list[Event]
+    def query(self, start_date: datetime, end_date: Optional[datetime] = None) -> List[Event]:
+        """
+        Returns the events that may occur between start_date and end_date (inclusive),
+        with the same semantics as `Event.occurs_on_range`. Results are sorted by start date.
+
+        :param start_date: Start of the date range.
+        :param end_date: End of the date range. If None, every event active from start_date on is returned.
+        """
+        if end_date is None:
+            end_date = _OPEN_END
+
+        found = [self._events[i] for i in self._query_tree(start_date, end_date)]
+        if self._removed:
+            found = [event for event in found if id(event) not in self._removed]
+
+        found.extend(
+            event for event in self._pending
+            if event.occurs_on_range(start_date, end_date)
+        )
+        if self._pending:
+            found.sort(key=lambda event: event.start_date)
+
+        return found
+
+    def _rebuild_if_needed(self) -> None:
+        if len(self._pending) + len(self._removed) > max(_MIN_PENDING, len(self._events) // _REBUILD_RATIO):
+            self._rebuild()
+
+    def _rebuild(self) -> None:
+        """Sorts every member by start date and recomputes the subtree max end dates."""
+        self._events = sorted(self._members.values(), key=lambda event: event.start_date)
+        self._starts = [event.start_date for event in self._events]
+        self._ends = [event.end_date if event.end_date is not None else _OPEN_END for event in self._events]
+        self._pending = []
+        self._removed = set()
+        self._max_level = self._index_max_ends()
+
+    def _index_max_ends(self) -> int:
+        """
+        Computes the max end date of every subtree in the implicit tree. Returns the tree height.
+
+        Node i sits at level k when its k lowest bits are 1; its children are i -/+ 2^(k-1).
+        """
+        n = len(self._ends)
+        self._max_ends = list(self._ends)
+        if n == 0:
+            return -1
+
+        max_ends = self._max_ends
+        last_i = (n - 1) & ~1  # Last leaf (level 0 nodes are the even indices)
+        last = max_ends[last_i]
+
+        k = 1
+        while 1 << k <= n:
+            x = 1 << (k - 1)
+            for i in range((x << 1) - 1, n, x << 2):
+                right = max_ends[i + x] if i + x < n else last
+                max_ends[i] = max(self._ends[i], max_ends[i - x], right)
+
+            last_i = last_i - x if (last_i >> k) & 1 else last_i + x  # Parent of the previous last node
+            if last_i < n and max_ends[last_i] > last:
+                last = max_ends[last_i]
+            k += 1
+
+        return k - 1
+
+    def _query_tree(self, start_date: datetime, end_date: datetime) -> List[int]:
+        """Returns the tree positions of the events overlapping [start_date, end_date]."""
+        n = len(self._events)
+        if n == 0:
+            return []
+
+        starts, ends, max_ends = self._starts, self._ends, self._max_ends
+        found = []
+
+        # Stack of (level, node, left child visited)
+        stack = [(self._max_level, (1 << self._max_level) - 1, False)]
+        while stack:
+            k, x, visited = stack.pop()
+
+            if k <= 3:
+                # Small subtree: scan it linearly
+                i = x >> k << k
+                last = min(i + (1 << (k + 1)) - 1, n)
+                while i < last and starts[i] <= end_date:
+                    if ends[i] >= start_date:
+                        found.append(i)
+                    i += 1
+
+            elif not visited:
+                left = x - (1 << (k - 1))  # May be out of range when the tree isn't complete
+                stack.append((k, x, True))
+                if left >= n or max_ends[left] >= start_date:
+                    stack.append((k - 1, left, False))
+
+            elif x < n and starts[x] <= end_date:
+                if ends[x] >= start_date:
+                    found.append(x)
+                stack.append((k - 1, x + (1 << (k - 1)), False))
+
+        return found
+
+
+_WEEKLY = "weekly"
+_MONTHLY = "monthly"
+_LAST_DAY = "last_day"
+
+
+class DateIndex:
+    """
+    Reverse index of recurring events by the dates they can occur on.
+
+    Weekly rules with interval n repeat every 7 * n days, so they are stored under
+    (n, date ordinal modulo 7 * n), one key per weekday. Monthly rules are stored under
+    (interval, month number modulo interval, day of month), and rules with use_last_day under the
+    latest day they clamp from. A lookup reads one or two buckets per distinct interval, then confirms
+    the few candidates with `Event.occurs_on` (start and end dates, time of day).
+    """
+
+    def __init__(self, events: Iterable[Event] = ()):
+        """
+        :param events: Events (or subclasses, or snapshots) to index.
+        """
+        self._members = {}  # id(event) => event
+        self._entries: Dict[int, Tuple[List[tuple], Optional[Tuple[str, int]]]] = {}  # id(event) => (keys, interval)
+        self._buckets: Dict[tuple, Dict[int, Event]] = {}
+        self._intervals = {_WEEKLY: {}, _MONTHLY: {}}  # Kind => {interval: number of indexed events}
+
+        for event in events:
+            self.add(event)
+
+    def __len__(self) -> int:
+        return len(self._members)
+
+    def __contains__(self, event: Event) -> bool:
+        return id(event) in self._members
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(list(self._members.values()))
+
+    def add(self, event: Event) -> None:
+        """Adds an event to the index. Adding an event that is already indexed has no effect."""
+        key = id(event)
+        if key in self._members:
+            return
+
+        keys, interval = _date_keys(event)
+        self._members[key] = event
+        self._entries[key] = (keys, interval)
+
+        for bucket_key in keys:
+            self._buckets.setdefault(bucket_key, {})[key] = event
+
+        if interval is not None:
+            counts = self._intervals[interval[0]]
+            counts[interval[1]] = counts.get(interval[1], 0) + 1
+
+    def remove(self, event: Event) -> bool:
+        """Removes an event from the index. Returns True if it was indexed."""
+        key = id(event)
+        if self._members.pop(key, None) is None:
+            return False
+
+        keys, interval = self._entries.pop(key)
+        for bucket_key in keys:
+            bucket = self._buckets[bucket_key]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[bucket_key]
+
+        if interval is not None:
+            counts = self._intervals[interval[0]]
+            counts[interval[1]] -= 1
+            if not counts[interval[1]]:
+                del counts[interval[1]]
+
+        return True
+
+    def refresh(self, event: Event) -> None:
+        """Re-indexes an event after its recurrence fields changed."""
+        self.remove(event)
+        self.add(event)
+
+    # date | datetime => events | list[Event]
+    def query(self, date: datetime) -> List[Event]:
+        """Returns the events occurring on the date, with `Event.occurs_on` semantics, sorted by start date."""
+        ordinal = date.toordinal()
+        month = date.year * 12 + date.month
+        last_day = calendar.monthrange(date.year, date.month)[1]
+
+        bucket_keys = [(_WEEKLY, n, ordinal % (7 * n)) for n in self._intervals[_WEEKLY]]
+        for n in self._intervals[_MONTHLY]:
+            bucket_keys.append((_MONTHLY, n, month % n, date.day))
+            if date.day == last_day:
+                # Rules with use_last_day and days past the end of this month fall on its last day
+                bucket_keys.extend((_LAST_DAY, n, month % n, day) for day in range(last_day + 1, 32))
+
+        found = {}
+        for bucket_key in bucket_keys:
+            for key, event in self._buckets.get(bucket_key, {}).items():
+                if key not in found and event.occurs_on(date):
+                    found[key] = event
+
+        return sorted(found.values(), key=lambda event: event.start_date)
+
+    # dates | list[datetime] => events | dict[datetime, list[Event]]
+    def query_dates(self, dates: Iterable[datetime]) -> Dict[datetime, List[Event]]:
+        """Returns a dictionary of date => events occurring on it (possibly an empty list)."""
+        return {date: self.query(date) for date in dates}
+
+
+def _date_keys(event: Event) -> Tuple[List[tuple], Optional[Tuple[str, int]]]:
+    """Returns the buckets of an event, and its (kind, interval) or None if it never occurs."""
+    rule = event.rule
+    interval = rule.interval
+    if not interval or interval < 1:
+        return [], None
+
+    if rule.weekly:
+        period = 7 * interval
+        start = rule.start_date.toordinal()
+        start_weekday = rule.start_date.weekday()
+
+        keys = []
+        for weekday in range(7):
+            if rule.weekday_mask >> weekday & 1:
+                offset = (weekday - start_weekday) % 7
+                keys.append((_WEEKLY, interval, (start + offset) % period))
+                if offset == 0 and interval > 1 and rule.start_date.time() != datetime.min.time():
+                    # A date earlier in the day than the start time counts as the last day of the previous week
+                    keys.append((_WEEKLY, interval, (start + 7) % period))
+
+        return keys, (_WEEKLY, interval)
+
+    phase = rule.start_month % interval
+    keys = [(_MONTHLY, interval, phase, day) for day in range(1, 32) if rule.day_mask >> day & 1]
+    if rule.use_last_day and rule.max_day > 28:
+        keys.append((_LAST_DAY, interval, phase, rule.max_day))
+
+    return keys, (_MONTHLY, interval)
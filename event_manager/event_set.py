@@ -0,0 +1,281 @@
+"""
+Compact, array-backed container of recurrence rules.
+
+`EventSet` keeps every rule as one position in parallel NumPy arrays (about 50 bytes per rule)
+instead of one SQLAlchemy-instrumented object with a list of days, so whole calendars can stay
+resident. Range filtering and occurrence expansion run on the arrays directly.
+"""
+import sys
+from datetime import datetime
+from typing import Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from .event import Event
+from .event_extensions import Transaction, TransactionSnapshot
+from .occurrence_engine import (
+    OCCURRENCE_COLUMNS, RECURRENT_TYPES, RuleArrays, count_rule_occurrences, day_mask, expand_rule_dates, rule_arrays
+)
+from .occurrence_timezone import _aware, expand_rule_instants
+
+
+def _intern(values: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns (int32 codes, distinct values). Missing values get the code -1."""
+    codes, table = pd.factorize(np.array(values, dtype=object))
+    return codes.astype(np.int32), np.asarray(table, dtype=object)
+
+
+def _decode(codes: np.ndarray, table: np.ndarray) -> np.ndarray:
+    """Inverse of _intern, as an object array."""
+    values = np.full(len(codes), None, dtype=object)
+    present = codes >= 0
+    values[present] = table[codes[present]]
+    return values
+
+
+def _days(mask: int) -> List[int]:
+    return [day for day in range(mask.bit_length()) if mask >> day & 1]
+
+
+class EventSet:
+    """
+    Recurrence rules stored as parallel arrays: ids, start/end dates as datetime64, type codes,
+    intervals, day bitmasks, use_last_day flags, amounts, and interned names, transaction types,
+    user IDs and timezones.
+
+    Built from Events, Transactions, TransactionSnapshots or SNAPSHOT_COLUMNS rows. Indexing with a
+    slice, an index array or a boolean mask returns a new EventSet sharing the interned tables.
+    """
+
+    def __init__(
+            self,
+            rules: RuleArrays,
+            ids: np.ndarray,
+            amounts: np.ndarray,
+            names: Tuple[np.ndarray, np.ndarray],
+            transaction_types: Tuple[np.ndarray, np.ndarray],
+            user_ids: Tuple[np.ndarray, np.ndarray],
+            timezones: Tuple[np.ndarray, np.ndarray]
+    ):
+        """
+        Use `from_events` or `from_rows` instead.
+
+        :param rules: Recurrence fields of the rules.
+        :param ids: int64 event IDs, -1 for events without ID.
+        :param amounts: float64 amounts, NaN for events without amount.
+        :param names: (codes, table) of the interned names. Likewise for transaction_types, user_ids
+                      and timezones.
+        """
+        self.rules = rules
+        self.ids = ids
+        self.amounts = amounts
+        self.name_codes, self.names = names
+        self.type_codes, self.transaction_types = transaction_types
+        self.user_codes, self.user_ids = user_ids
+        self.zone_codes, self.timezones = timezones
+
+    @classmethod
+    def from_events(cls, events: Sequence[Event]) -> "EventSet":
+        """Builds a set from Events, Transactions or TransactionSnapshots."""
+        return cls._build(
+            rule_arrays(events),
+            [getattr(event, "id", None) for event in events],
+            [getattr(event, "amount", None) for event in events],
+            [getattr(event, "name", None) for event in events],
+            [getattr(event, "transaction_type", None) for event in events],
+            [getattr(event, "user_id", None) for event in events],
+            [getattr(event, "timezone", None) for event in events]
+        )
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence]) -> "EventSet":
+        """
+        Builds a set from query rows with the SNAPSHOT_COLUMNS values, e.g. the results of
+        `session.execute(user_transactions_query(...))`, without creating any object per row.
+        """
+        columns = list(zip(*rows)) or [()] * 12
+        (
+            ids, names, starts, ends, recurrent_types, intervals, days, use_last_day, amounts, transaction_types,
+            user_ids, timezones
+        ) = columns
+
+        rules = RuleArrays(
+            types=np.array([RECURRENT_TYPES.index(t) if t in RECURRENT_TYPES else -1 for t in recurrent_types], dtype=np.int8),
+            starts=np.array(starts, dtype="datetime64[us]"),
+            ends=np.array(ends, dtype="datetime64[us]"),
+            intervals=np.array(intervals, dtype=np.int64),
+            day_masks=np.array([day_mask(event_days) for event_days in days], dtype=np.int64),
+            use_last_day=np.array([bool(flag) for flag in use_last_day], dtype=bool)
+        )
+
+        return cls._build(rules, ids, amounts, names, transaction_types, user_ids, timezones)
+
+    @classmethod
+    def _build(cls, rules: RuleArrays, ids, amounts, names, transaction_types, user_ids, timezones) -> "EventSet":
+        # Narrow dtypes: intervals are small and day masks use at most 32 bits
+        rules = rules._replace(intervals=rules.intervals.astype(np.int32), day_masks=rules.day_masks.astype(np.uint32))
+
+        return cls(
+            rules,
+            np.array([-1 if event_id is None else event_id for event_id in ids], dtype=np.int64),
+            np.array(amounts, dtype=float),
+            _intern(names),
+            _intern(transaction_types),
+            _intern(user_ids),
+            _intern(timezones)
+        )
+
+    @classmethod
+    def concat(cls, event_sets: Sequence["EventSet"]) -> "EventSet":
+        """Merges several sets (e.g. streamed batches) into one, re-interning their tables."""
+        if not event_sets:
+            return cls.from_events([])
+
+        return cls(
+            RuleArrays(*(np.concatenate(arrays) for arrays in zip(*(s.rules for s in event_sets)))),
+            np.concatenate([s.ids for s in event_sets]),
+            np.concatenate([s.amounts for s in event_sets]),
+            _intern(np.concatenate([_decode(s.name_codes, s.names) for s in event_sets])),
+            _intern(np.concatenate([_decode(s.type_codes, s.transaction_types) for s in event_sets])),
+            _intern(np.concatenate([_decode(s.user_codes, s.user_ids) for s in event_sets])),
+            _intern(np.concatenate([_decode(s.zone_codes, s.timezones) for s in event_sets]))
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, key: Union[int, slice, np.ndarray, Sequence[int]]) -> Union["EventSet", TransactionSnapshot]:
+        if isinstance(key, (int, np.integer)):
+            return self[[key]].to_snapshots()[0]
+
+        return EventSet(
+            self.rules.take(key),
+            self.ids[key],
+            self.amounts[key],
+            (self.name_codes[key], self.names),
+            (self.type_codes[key], self.transaction_types),
+            (self.user_codes[key], self.user_ids),
+            (self.zone_codes[key], self.timezones)
+        )
+
+    def __repr__(self):
+        return f"<EventSet(events={len(self)}, users={len(self.user_ids)}, nbytes={self.nbytes})>"
+
+    @property
+    def nbytes(self) -> int:
+        """Memory used by the arrays (the interned tables are counted once per distinct value)."""
+        arrays = [*self.rules, self.ids, self.amounts, self.name_codes, self.type_codes, self.user_codes, self.zone_codes]
+        tables = [self.names, self.transaction_types, self.user_ids, self.timezones]
+        return sum(array.nbytes for array in arrays) + sum(sys.getsizeof(value) for table in tables for value in table)
+
+    # start_date, end_date | datetime => mask | ndarray
+    def range_mask(self, start_date: datetime, end_date: Optional[datetime] = None) -> np.ndarray:
+        """Boolean mask of the events active in the date range, with `Event.occurs_on_range` semantics."""
+        starts, ends = self.rules.starts, self.rules.ends
+        mask = np.isnat(ends) | (ends >= np.datetime64(start_date, "us"))
+        if end_date is not None:
+            mask &= starts <= np.datetime64(end_date, "us")
+        return mask
+
+    def filter_range(self, start_date: datetime, end_date: Optional[datetime] = None) -> "EventSet":
+        """Returns the events active in the date range."""
+        return self[self.range_mask(start_date, end_date)]
+
+    def filter_users(self, user_ids: Iterable[str]) -> "EventSet":
+        """Returns the events of the given users."""
+        codes = np.flatnonzero(np.isin(self.user_ids, [str(user_id) for user_id in user_ids]))
+        return self[np.isin(self.user_codes, codes)]
+
+    def expand(self, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Computes every occurrence between start and end (inclusive).
+
+        :return: Tuple of (positions in the set, dates as datetime64[us]), sorted by position and date.
+        """
+        return expand_rule_dates(self.rules, start, end)
+
+    def count_occurrences(self, start: datetime, end: datetime, bounds: np.ndarray) -> np.ndarray:
+        """Counts the occurrences of every event per period, see `occurrence_engine.count_occurrences`."""
+        return count_rule_occurrences(self.rules, start, end, bounds)
+
+    def get_occurrence_df(
+            self,
+            start: datetime,
+            end: datetime,
+            tz: Optional[str] = None,
+            use_event_time: bool = False
+    ) -> pd.DataFrame:
+        """Same as `utils.get_occurrence_df`, built from the arrays (amounts are NaN when missing)."""
+        if use_event_time and tz is None:
+            raise ValueError("use_event_time requires a timezone.")
+
+        if tz is None:
+            positions, dates = self.expand(start, end)
+        else:
+            # Events without timezone recur in tz, which gets the code after the interned zones
+            zones = np.where(self.zone_codes < 0, len(self.timezones), self.zone_codes)
+            positions, dates = expand_rule_instants(
+                self.rules, zones, [*self.timezones, tz], _aware(start, tz), _aware(end, tz), use_event_time
+            )
+            dates = pd.DatetimeIndex(dates.astype("datetime64[ns]")).tz_localize("UTC").tz_convert(tz)
+
+        ids = self.ids[positions]
+        if (ids < 0).any():
+            ids = np.where(ids < 0, None, ids)
+
+        return pd.DataFrame({
+            "event_id": ids,
+            "name": pd.Categorical.from_codes(self.name_codes[positions], categories=self.names),
+            "date": dates if tz is not None else dates.astype("datetime64[ns]"),
+            "amount": self.amounts[positions],
+            "transaction_type": pd.Categorical.from_codes(self.type_codes[positions], categories=self.transaction_types),
+            "user_id": pd.Categorical.from_codes(self.user_codes[positions], categories=self.user_ids)
+        }, columns=OCCURRENCE_COLUMNS)
+
+    def _fields(self) -> Iterable[tuple]:
+        """Yields the SNAPSHOT_COLUMNS values of every event."""
+        rules = self.rules
+        amounts = [None if np.isnan(amount) else amount for amount in self.amounts.tolist()]
+
+        return zip(
+            [None if event_id < 0 else event_id for event_id in self.ids.tolist()],
+            _decode(self.name_codes, self.names).tolist(),
+            rules.starts.tolist(),
+            rules.ends.tolist(),
+            [RECURRENT_TYPES[code] if code >= 0 else None for code in rules.types.tolist()],
+            rules.intervals.tolist(),
+            [_days(mask) for mask in rules.day_masks.tolist()],
+            rules.use_last_day.tolist(),
+            amounts,
+            _decode(self.type_codes, self.transaction_types).tolist(),
+            _decode(self.user_codes, self.user_ids).tolist(),
+            _decode(self.zone_codes, self.timezones).tolist()
+        )
+
+    def to_snapshots(self) -> List[TransactionSnapshot]:
+        """Returns the events as TransactionSnapshots."""
+        return [TransactionSnapshot(*fields) for fields in self._fields()]
+
+    def to_events(self) -> List[Event]:
+        """
+        Returns the events as new (transient) Transactions, or Events when they have no amount
+        or transaction type. Stored IDs are kept.
+        """
+        events = []
+        for (
+                event_id, name, start, end, recurrent_type, interval, days, use_last_day, amount, transaction_type,
+                user_id, timezone
+        ) in self._fields():
+            fields = dict(
+                name=name, start_date=start, end_date=end, recurrent_type=recurrent_type,
+                interval=interval, days=days, use_last_day=use_last_day, timezone=timezone
+            )
+            if amount is None or transaction_type is None:
+                event = Event(**fields)
+            else:
+                event = Transaction(amount=amount, transaction_type=transaction_type, user_id=user_id, **fields)
+
+            if event_id is not None:
+                event.id = event_id
+            events.append(event)
+
+        return events
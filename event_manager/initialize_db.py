@@ -1,9 +1,65 @@
-from event import Base
-from event_extensions import Transaction
-from db_session import engine
+from .event import Base, Event, day_mask
+from .event_extensions import Transaction
+from sqlalchemy import bindparam, inspect, select, text, update
+from .db_session import get_engine
+
+def _create_indexes(connection):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+def _add_columns(connection):
+    """Adds the columns missing from existing tables, then fills the days_mask of rows stored before it existed."""
+    inspector = inspect(connection)
+    quote = connection.dialect.identifier_preparer.quote
+    for table in Base.metadata.sorted_tables:
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} {column_type}"))
+
+    table = Event.__table__
+    rows = connection.execute(select(table.c.id, table.c.days).where(table.c.days_mask == None)).all()
+    if rows:
+        connection.execute(
+            update(table).where(table.c.id == bindparam("row_id")).values(days_mask=bindparam("mask")),
+            [{"row_id": row.id, "mask": day_mask(row.days)} for row in rows]
+        )
+
+def _upgrade(connection):
+    _add_columns(connection)
+    _create_indexes(connection)
 
 def initialize_database():
+    """
+    Creates the tables and indexes that don't exist yet. Existing tables get their missing
+    columns and indexes.
+    """
+    engine = get_engine()
     Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        _upgrade(connection)
+
+def analyze_database():
+    """
+    Refreshes the planner statistics (SQLite and PostgreSQL), e.g. after a bulk load.
+
+    Without statistics, SQLite may choose the (event_type, start_date, end_date) index for per-user
+    and keyset-paginated queries, then scan and sort every transaction of the period.
+    """
+    engine = get_engine()
+    if engine.dialect.name in ("sqlite", "postgresql"):
+        with engine.begin() as connection:
+            connection.execute(text("ANALYZE"))
+
+async def initialize_database_async():
+    """Async version of initialize_database, using the async engine."""
+    from .async_session import get_async_engine
+
+    async with get_async_engine().begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+        await connection.run_sync(_upgrade)
 
 if __name__ == '__main__':
     initialize_database()
@@ -0,0 +1,184 @@
+"""
+Counters and timers for the hot paths of the module.
+
+Instrumentation is disabled by default: every recording function then returns after a single flag
+check, and `timer()` hands back a shared no-op context manager. Enable it with `enable()` or the
+EVENT_MANAGER_INSTRUMENTATION environment variable, then read the metrics with `snapshot()`,
+`to_prometheus()`, or a callback receiving every measurement.
+
+Recorded metrics:
+- events_scanned, events_matched: events filtered by get_events_in_range
+- occurrences_produced: rows returned by the occurrence DataFrame functions
+- db_rows_fetched: rows loaded by the query functions
+- cache_hits, cache_misses: OccurrenceCache and OccurrenceStore lookups
+- one timer per instrumented function (query and CRUD time, expansion time...)
+"""
+import functools
+import logging
+import os
+import re
+import threading
+from time import perf_counter
+from typing import Callable, Dict, List
+
+logger = logging.getLogger(__name__)
+
+enabled = os.environ.get("EVENT_MANAGER_INSTRUMENTATION", "").lower() in ("1", "true", "yes", "on")
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_timers: Dict[str, List[float]] = {}  # name => [count, total seconds, max seconds]
+_callbacks: List[Callable[[str, str, float], None]] = []
+
+
+def enable() -> None:
+    """Starts recording metrics."""
+    global enabled
+    enabled = True
+
+
+def disable() -> None:
+    """Stops recording metrics. Recorded values are kept until reset()."""
+    global enabled
+    enabled = False
+
+
+def reset() -> None:
+    """Drops every recorded value."""
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+
+def add_callback(callback: Callable[[str, str, float], None]) -> None:
+    """
+    Registers a callback called as `callback(kind, name, value)` for every measurement,
+    with kind "counter" (value = increment) or "timer" (value = seconds). E.g. to forward to StatsD.
+    """
+    _callbacks.append(callback)
+
+
+def remove_callback(callback: Callable[[str, str, float], None]) -> None:
+    """Unregisters a callback added with add_callback."""
+    if callback in _callbacks:
+        _callbacks.remove(callback)
+
+
+def incr(name: str, value: float = 1) -> None:
+    """Increments a counter."""
+    if not enabled:
+        return
+
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+    for callback in _callbacks:
+        callback("counter", name, value)
+
+
+def observe(name: str, seconds: float) -> None:
+    """Records a duration for a timer."""
+    if not enabled:
+        return
+
+    with _lock:
+        timer_values = _timers.setdefault(name, [0, 0.0, 0.0])
+        timer_values[0] += 1
+        timer_values[1] += seconds
+        timer_values[2] = max(timer_values[2], seconds)
+
+    logger.debug("%s took %.3f ms", name, seconds * 1000)
+    for callback in _callbacks:
+        callback("timer", name, seconds)
+
+
+class _Timer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = 0.0
+
+    def __enter__(self):
+        self.started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.name, perf_counter() - self.started)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name: str):
+    """Context manager timing its block. A shared no-op when instrumentation is disabled."""
+    return _Timer(name) if enabled else _NULL_TIMER
+
+
+def timed(name: str) -> Callable:
+    """Decorator timing every call of a function under the given timer name."""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+
+            started = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                observe(name, perf_counter() - started)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> Dict[str, Dict]:
+    """
+    Returns a copy of the recorded metrics:
+    {"counters": {name: value}, "timers": {name: {"count", "total", "max", "mean"}}}
+    """
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timers": {
+                name: {"count": count, "total": total, "max": maximum, "mean": total / count}
+                for name, (count, total, maximum) in _timers.items()
+            }
+        }
+
+
+def _metric_name(prefix: str, name: str, suffix: str) -> str:
+    """Prometheus metric name, with the characters it doesn't allow (e.g. dots) replaced by underscores."""
+    return re.sub(r"[^a-zA-Z0-9_:]", "_", f"{prefix}_{name}_{suffix}")
+
+
+def to_prometheus(prefix: str = "event_manager") -> str:
+    """Returns the recorded metrics in the Prometheus text exposition format."""
+    metrics = snapshot()
+    lines = []
+
+    for name, value in sorted(metrics["counters"].items()):
+        metric = _metric_name(prefix, name, "total")
+        lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{metric} {value}")
+
+    for name, values in sorted(metrics["timers"].items()):
+        metric = _metric_name(prefix, name, "seconds")
+        lines.append(f"# TYPE {metric} summary")
+        lines.append(f"{metric}_count {values['count']}")
+        lines.append(f"{metric}_sum {values['total']}")
+
+    return "\n".join(lines) + "\n"
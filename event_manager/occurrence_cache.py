@@ -0,0 +1,161 @@
+"""
+LRU memoization of occurrence expansions.
+
+Expansions are cached per recurrence rule and month-aligned window, so dashboards paging over
+overlapping windows reuse them. The start date of each rule is reduced to a canonical anchor
+(same weekly phase or monthly parity), so every event sharing a rule shares the cached dates;
+each event then only clips them to its own start and end dates.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+from .event import Event, RecurrenceMixin
+from .instrumentation import incr
+from .occurrence_engine import OCCURRENCE_COLUMNS, OCCURRENCE_DTYPES, event_columns
+
+DEFAULT_MAXSIZE = 1024
+
+# Canonical anchors are taken in the 7 * interval days (or interval months) following this Monday
+_EPOCH = datetime(1970, 1, 5)
+
+
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    evictions: int
+    maxsize: int
+    currsize: int
+
+
+class _CanonicalRule(RecurrenceMixin):
+    """Open-ended rule anchored at the canonical start date, expanded on cache misses."""
+    __slots__ = ("name", "start_date", "end_date", "recurrent_type", "interval", "days", "use_last_day", "_rule")
+
+    def __init__(self, start_date: datetime, recurrent_type: str, interval: int, days: Tuple[int, ...], use_last_day: bool):
+        self.name = "canonical"
+        self.start_date = start_date
+        self.end_date = None
+        self.recurrent_type = recurrent_type
+        self.interval = interval
+        self.days = list(days)
+        self.use_last_day = use_last_day
+        self._rule = None
+
+
+class OccurrenceCache:
+    """
+    Bounded LRU cache of occurrence dates, keyed by recurrence signature and aligned window.
+    Safe to share between threads.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MAXSIZE):
+        """
+        :param maxsize: Maximum number of cached expansions. The least recently used one is evicted first.
+        """
+        if maxsize < 1:
+            raise ValueError("Cache size must be a positive integer.")
+
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[tuple, List[datetime]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Returns the hit, miss and eviction counts and the current size."""
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self.maxsize, len(self._entries))
+
+    def cache_clear(self) -> None:
+        """Drops every cached expansion and resets the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    # event | Event, start, end | datetime => dates | list[datetime]
+    def get_occurrences(self, event: Event, start: datetime, end: datetime) -> List[datetime]:
+        """Returns the same dates as `event.get_occurrences(start, end)`, reusing cached expansions."""
+        if not event.occurs_on_range(start, end):
+            return []
+
+        key = self._key(event, start, end)
+        if key is None:
+            return event.get_occurrences(start, end)  # Window before the canonical anchors
+
+        with self._lock:
+            dates = self._entries.get(key)
+            if dates is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+            else:
+                self._misses += 1
+
+        incr("cache_misses" if dates is None else "cache_hits")
+
+        if dates is None:
+            _, anchor, recurrent_type, interval, days, use_last_day, window_start, window_end = key
+            rule = _CanonicalRule(anchor, recurrent_type, interval, days, use_last_day)
+            dates = rule.get_occurrences(window_start, window_end)
+
+            with self._lock:
+                self._entries[key] = dates
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+
+        lower = max(start, event.start_date)
+        upper = end if event.end_date is None else min(end, event.end_date)
+        return dates[bisect_left(dates, lower):bisect_right(dates, upper)]
+
+    def get_occurrence_df(self, events: Sequence[Event], start: datetime, end: datetime) -> pd.DataFrame:
+        """Same as `utils.get_occurrence_df`, reusing cached expansions."""
+        positions = []
+        dates = []
+        for position, e in enumerate(events):
+            event_dates = self.get_occurrences(e, start, end)
+            positions.extend([position] * len(event_dates))
+            dates.extend(event_dates)
+
+        columns = event_columns(events, np.array(positions, dtype=np.int64))
+        columns["date"] = dates
+
+        incr("occurrences_produced", len(dates))
+        return pd.DataFrame(columns, columns=OCCURRENCE_COLUMNS).astype(OCCURRENCE_DTYPES)
+
+    @staticmethod
+    def _key(event: Event, start: datetime, end: datetime) -> Optional[tuple]:
+        """Builds the cache key, or returns None when the window can't use a canonical anchor."""
+        interval = event.interval
+        days = tuple(sorted(set(event.days or ())))
+
+        if event.recurrent_type == "weekly":
+            # Shifting the start by whole blocks of `interval` weeks keeps the same occurrences
+            anchor = _EPOCH + (event.start_date - _EPOCH) % timedelta(weeks=interval)
+            use_last_day = False
+        else:
+            months = (event.start_date.year * 12 + event.start_date.month - 1) - (_EPOCH.year * 12 + _EPOCH.month - 1)
+            anchor_month = _EPOCH.month - 1 + months % interval
+            anchor = datetime(_EPOCH.year + anchor_month // 12, anchor_month % 12 + 1, 1)
+            use_last_day = bool(event.use_last_day)
+
+        # Align the window to whole months, keeping the time of day of the query start
+        window_start = start.replace(day=1)
+        next_month = (end.replace(day=1) + timedelta(days=32)).replace(day=1)
+        window_end = start.replace(year=next_month.year, month=next_month.month, day=1) - timedelta(days=1)
+        if window_end < end:
+            window_end = end
+
+        if window_start < anchor:
+            return None
+
+        # Cached dates keep the type of the query start (datetime or pandas Timestamp)
+        return (
+            type(start), anchor, event.recurrent_type, interval, days, use_last_day,
+            window_start, window_end
+        )
@@ -0,0 +1,347 @@
+"""
+Vectorized occurrence engine.
+
+Expands the occurrences of many events at once using NumPy datetime64 arithmetic instead of
+calling `Event.get_occurrences` one event at a time. The results follow the exact same rules as
+`Event.occurs_on`, including the 7-day blocks anchored at each event start for weekly intervals
+and the `use_last_day` clamping for monthly events.
+"""
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import numpy as np
+from .event import Event, day_mask
+
+OCCURRENCE_COLUMNS = ["event_id", "name", "date", "amount", "transaction_type", "user_id"]
+
+# Text columns with few distinct values, returned as pandas categoricals
+CATEGORICAL_COLUMNS = ["name", "transaction_type", "user_id"]
+
+# dtypes of the occurrence DataFrames
+OCCURRENCE_DTYPES = {"date": "datetime64[ns]", **{column: "category" for column in CATEGORICAL_COLUMNS}}
+
+# Occurrence columns copied from the event => (event attribute, value when the event doesn't have it)
+EVENT_COLUMNS = {
+    "event_id": ("id", None),
+    "name": ("name", ""),
+    "amount": ("amount", None),
+    "transaction_type": ("transaction_type", None),
+    "user_id": ("user_id", None)
+}
+
+_DAY = np.timedelta64(1, "D")
+
+# Recurrent types by type code
+RECURRENT_TYPES = ("weekly", "monthly")
+_TYPE_CODES = {recurrent_type: code for code, recurrent_type in enumerate(RECURRENT_TYPES)}
+
+
+class RuleArrays(NamedTuple):
+    """Recurrence rules stored as parallel arrays, one position per rule."""
+    types: np.ndarray  # int8 code in RECURRENT_TYPES, -1 for unknown types
+    starts: np.ndarray  # datetime64[us]
+    ends: np.ndarray  # datetime64[us], NaT for open-ended rules
+    intervals: np.ndarray  # Weeks or months between occurrences
+    day_masks: np.ndarray  # int64, bit n set for weekday n (weekly) or day n of the month (monthly)
+    use_last_day: np.ndarray  # bool
+
+    def take(self, indices) -> "RuleArrays":
+        """Returns the rules at the given positions (or boolean mask)."""
+        return RuleArrays(*(array[indices] for array in self))
+
+
+# events | list[Event] => rules | RuleArrays
+def rule_arrays(events: Sequence[Event]) -> RuleArrays:
+    """Copies the recurrence fields of the events into RuleArrays."""
+    return RuleArrays(
+        types=np.array([_TYPE_CODES.get(event.recurrent_type, -1) for event in events], dtype=np.int8),
+        starts=np.array([event.start_date for event in events], dtype="datetime64[us]"),
+        ends=np.array([event.end_date for event in events], dtype="datetime64[us]"),
+        intervals=np.array([event.interval for event in events], dtype=np.int64),
+        day_masks=np.array([day_mask(event.days) for event in events], dtype=np.int64),
+        use_last_day=np.array([bool(event.use_last_day) for event in events], dtype=bool)
+    )
+
+
+# events | list[Event], start, end | datetime => positions, dates | ndarray, ndarray
+def expand_occurrence_dates(events: Sequence[Event], start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes every occurrence of the given events between start and end (inclusive).
+
+    Events are grouped by recurrent type and exploded into one row per (event, day) pair, so every
+    rule sharing a type is expanded by the same array operations regardless of its interval or days.
+
+    :param events: Events (or subclasses) to expand.
+    :param start: Start of the date range. Occurrences keep its time of day.
+    :param end: End of the date range.
+    :return: Tuple of (event positions in `events`, occurrence dates as datetime64[us]),
+             sorted by event position and then by date.
+    """
+    return expand_rule_dates(rule_arrays(events), start, end)
+
+
+# rules | RuleArrays, start, end | datetime => positions, dates | ndarray, ndarray
+def expand_rule_dates(rules: RuleArrays, start: datetime, end: datetime) -> Tuple[np.ndarray, np.ndarray]:
+    """Same as `expand_occurrence_dates`, for rules already stored as arrays."""
+    query_start = np.datetime64(start, "us")
+    query_end = np.datetime64(end, "us")
+
+    positions = []
+    dates = []
+    for code, expand in enumerate((_expand_weekly, _expand_monthly)):
+        group = np.flatnonzero(rules.types == code)
+        if not len(group):
+            continue
+
+        group_positions, group_dates = expand(rules.take(group), query_start, query_end)
+        positions.append(group[group_positions])
+        dates.append(group_dates)
+
+    if not positions:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[us]")
+
+    positions = np.concatenate(positions)
+    dates = np.concatenate(dates)
+
+    # Sort by event and date, then drop duplicated dates (e.g. several days clamped to the same last day)
+    order = np.lexsort((dates, positions))
+    positions = positions[order]
+    dates = dates[order]
+    keep = np.ones(len(dates), dtype=bool)
+    keep[1:] = (positions[1:] != positions[:-1]) | (dates[1:] != dates[:-1])
+
+    return positions[keep], dates[keep]
+
+
+# events | list[Event], start, end | datetime => columns | dict[str, ndarray]
+def expand_occurrences(events: Sequence[Event], start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+    """
+    Computes every occurrence of the given events and returns them as columnar arrays.
+
+    Columns follow `OCCURRENCE_COLUMNS`: event_id, name, date, amount, transaction_type and user_id.
+    Attributes missing on an event (e.g. `amount` on a plain Event) are filled with None.
+    """
+    positions, dates = expand_occurrence_dates(events, start, end)
+
+    columns = event_columns(events, positions)
+    columns["date"] = dates.astype("datetime64[ns]")
+
+    return {column: columns[column] for column in OCCURRENCE_COLUMNS}
+
+
+# events | list[Event] => values | dict[str, list]
+def event_column_values(events: Sequence[Event]) -> Dict[str, List]:
+    """Values of the EVENT_COLUMNS for every event, as lists parallel to `events` (None entries get the defaults)."""
+    return {
+        column: [getattr(event, attribute, default) for event in events]
+        for column, (attribute, default) in EVENT_COLUMNS.items()
+    }
+
+
+# events | list[Event], positions | ndarray => columns | dict[str, ndarray]
+def event_columns(events: Sequence[Event], positions: np.ndarray) -> Dict[str, np.ndarray]:
+    """The EVENT_COLUMNS of occurrences given by their event positions in `events`."""
+    return {column: _as_array(values)[positions] for column, values in event_column_values(events).items()}
+
+
+# events | list[Event], start, end | datetime, bounds | ndarray => counts | ndarray
+def count_occurrences(events: Sequence[Event], start: datetime, end: datetime, bounds: np.ndarray) -> np.ndarray:
+    """
+    Counts the occurrences of every event in consecutive periods, without expanding them.
+
+    Weekly events are counted as arithmetic progressions. Monthly events are counted month by month
+    from their days bitmask (clamped to the month length and to the valid date range).
+
+    :param events: Events (or subclasses) to count.
+    :param start: Start of the date range. Occurrences before it are not counted.
+    :param end: End of the date range. Occurrences after it are not counted.
+    :param bounds: Sorted datetime64 array of period starts. Period j covers the days from
+                   bounds[j] (inclusive) to bounds[j + 1] (exclusive).
+    :return: Array of shape (len(events), len(bounds) - 1) with the occurrence counts.
+    """
+    return count_rule_occurrences(rule_arrays(events), start, end, bounds)
+
+
+# rules | RuleArrays, start, end | datetime, bounds | ndarray => counts | ndarray
+def count_rule_occurrences(rules: RuleArrays, start: datetime, end: datetime, bounds: np.ndarray) -> np.ndarray:
+    """Same as `count_occurrences`, for rules already stored as arrays."""
+    query_start = np.datetime64(start, "us")
+    query_end = np.datetime64(end, "us")
+
+    # Bounds as day offsets from query_start, clipped to the range (occurrences outside it don't count)
+    first_day = query_start.astype("datetime64[D]")
+    last_offset = (query_end.astype("datetime64[D]") - first_day) // _DAY + 1
+    offsets = np.clip((np.asarray(bounds, dtype="datetime64[D]") - first_day) // _DAY, 0, max(last_offset, 0))
+
+    counts = np.zeros((len(rules.types), max(len(offsets) - 1, 0)), dtype=np.int64)
+    for code, count in enumerate((_count_weekly, _count_monthly)):
+        group = np.flatnonzero(rules.types == code)
+        if len(group) and len(offsets) > 1:
+            below = count(rules.take(group), query_start, query_end, offsets)
+            counts[group] = np.diff(below, axis=1)
+
+    return counts
+
+
+def _count_weekly(rules: RuleArrays, query_start: np.datetime64, query_end: np.datetime64, offsets: np.ndarray) -> np.ndarray:
+    """Returns, per rule and bound, the number of occurrences before the bound."""
+    owners, k, counts, step = _weekly_progressions(rules, query_start, query_end)
+
+    # Terms of each progression below every bound: ceil((offset - first) / step), within [0, count]
+    below = np.clip(-((k[:, None] - offsets[None, :]) // step[:, None]), 0, counts[:, None])
+
+    totals = np.zeros((len(rules.types), len(offsets)), dtype=np.int64)
+    np.add.at(totals, owners, below)
+
+    return totals
+
+
+def _count_monthly(rules: RuleArrays, query_start: np.datetime64, query_end: np.datetime64, offsets: np.ndarray) -> np.ndarray:
+    """Returns, per rule and bound, the number of occurrences before the bound."""
+    starts, limits = _bounds(rules, query_start, query_end)
+    intervals = rules.intervals
+    use_last_day = rules.use_last_day
+    masks = rules.day_masks >> 1  # Bit i for day i + 1
+
+    # Day offsets of the first and last valid dates of each event, as in _expand_weekly
+    first_k = np.maximum(0, -((query_start - starts) // _DAY))
+    last_k = (limits - query_start) // _DAY
+
+    # Every month containing a bound
+    first_day = query_start.astype("datetime64[D]")
+    bound_months = (first_day + offsets * _DAY).astype("datetime64[M]")
+    months = np.arange(bound_months[0], bound_months[-1] + 1)
+    month_offsets = (months.astype("datetime64[D]") - first_day) // _DAY
+    month_lengths = ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")) // _DAY
+
+    # Bit i of each (event, month) mask is set when the event occurs on day i + 1 of the month
+    lengths = month_lengths[None, :]
+    month_masks = masks[:, None] & ((1 << lengths) - 1)
+    clamped = use_last_day[:, None] & ((masks[:, None] >> lengths) != 0)
+    month_masks |= np.where(clamped, 1 << (lengths - 1), 0)
+
+    anchors = starts.astype("datetime64[M]").astype(np.int64)
+    month_numbers = months.astype(np.int64)[None, :]
+    in_interval = (month_numbers >= anchors[:, None]) & ((month_numbers - anchors[:, None]) % intervals[:, None] == 0)
+
+    # Keep only the days between the first and last valid dates
+    low = np.clip(first_k[:, None] - month_offsets[None, :], 0, 31)
+    high = np.clip(last_k[:, None] - month_offsets[None, :] + 1, 0, 31)
+    window = ((1 << high) - 1) & ~((1 << low) - 1)
+    month_masks = np.where(in_interval, month_masks & window, 0)
+
+    # Occurrences before each bound: whole previous months plus the days of its month before it
+    month_counts = np.bitwise_count(month_masks).astype(np.int64)
+    previous = np.cumsum(month_counts, axis=1) - month_counts
+
+    positions = np.searchsorted(month_offsets, offsets, side="right") - 1
+    days_before = np.clip(offsets - month_offsets[positions], 0, 31)
+    partial = np.bitwise_count(month_masks[:, positions] & ((1 << days_before) - 1)[None, :])
+
+    return previous[:, positions] + partial
+
+
+def _as_array(values: List) -> np.ndarray:
+    """Builds a per-event array, falling back to an object array for mixed or missing values."""
+    if any(value is None for value in values):
+        return np.array(values, dtype=object)
+
+    array = np.array(values)
+    return array if array.dtype.kind in "biuf" else np.array(values, dtype=object)
+
+
+def _bounds(rules: RuleArrays, query_start: np.datetime64, query_end: np.datetime64):
+    """Returns the per-rule start dates and last valid dates (clipped to the query end)."""
+    limits = np.where(np.isnat(rules.ends), query_end, np.minimum(rules.ends, query_end))
+
+    return rules.starts, limits
+
+
+def _explode_days(rules: RuleArrays) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns one (rule index, day) row per day set in each rule mask."""
+    owners = []
+    days = []
+    for day in range(int(rules.day_masks.max(initial=0)).bit_length()):
+        with_day = np.flatnonzero((rules.day_masks >> day) & 1)
+        owners.append(with_day)
+        days.append(np.full(len(with_day), day, dtype=np.int64))
+
+    if not owners:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    return np.concatenate(owners), np.concatenate(days)
+
+
+def _repeat_ranges(firsts: np.ndarray, counts: np.ndarray, steps: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Expands each (first, count, step) arithmetic progression. Returns (row index, value) arrays."""
+    counts = np.maximum(counts, 0)
+    rows = np.repeat(np.arange(len(counts), dtype=np.int64), counts)
+    offsets = np.arange(int(counts.sum()), dtype=np.int64) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    return rows, firsts[rows] + offsets * steps[rows]
+
+
+def _weekly_progressions(rules: RuleArrays, query_start: np.datetime64, query_end: np.datetime64):
+    """
+    Describes weekly rules as arithmetic progressions of `7 * interval` days per weekday.
+
+    :return: Tuple of (rule index, first day offset from query_start, number of terms, step) arrays.
+    """
+    starts, limits = _bounds(rules, query_start, query_end)
+    intervals = rules.intervals
+
+    # Day offsets (k) from query_start, matching the days a daily date_range would visit.
+    first_k = np.maximum(0, -((query_start - starts) // _DAY))
+    last_k = (limits - query_start) // _DAY
+    base = (query_start - starts) // _DAY  # Days since each event start for k = 0
+
+    owners, weekdays = _explode_days(rules)
+    query_weekday = int((query_start.astype("datetime64[D]").astype(np.int64) + 3) % 7)  # 1970-01-01 was a Thursday
+
+    interval = intervals[owners]
+    step = 7 * interval
+    k = (weekdays - query_weekday) % 7  # First day offset landing on the weekday
+    k = k + 7 * (-((base[owners] + k) // 7) % interval)  # Move to the first block aligned with the interval
+    k = k + step * np.maximum(0, -((k - first_k[owners]) // step))  # Skip to the first offset inside the event
+    counts = np.where(k <= last_k[owners], (last_k[owners] - k) // step + 1, 0)
+
+    return owners, k, counts, step
+
+
+def _expand_weekly(rules: RuleArrays, query_start: np.datetime64, query_end: np.datetime64):
+    """Expands weekly rules as arithmetic progressions of `7 * interval` days per weekday."""
+    owners, k, counts, step = _weekly_progressions(rules, query_start, query_end)
+    rows, offsets = _repeat_ranges(k, counts, step)
+
+    return owners[rows], query_start + offsets * _DAY
+
+
+def _expand_monthly(rules: RuleArrays, query_start: np.datetime64, query_end: np.datetime64):
+    """Expands monthly rules month by month, clamping days to the month length when use_last_day is set."""
+    starts, limits = _bounds(rules, query_start, query_end)
+    intervals = rules.intervals
+    use_last_day = rules.use_last_day
+
+    anchor = starts.astype("datetime64[M]").astype(np.int64)
+    first_month = np.maximum(query_start.astype("datetime64[M]").astype(np.int64), anchor)
+    first_month = first_month + (anchor - first_month) % intervals  # Align with the event interval
+    last_month = limits.astype("datetime64[M]").astype(np.int64)
+    counts = np.where(first_month <= last_month, (last_month - first_month) // intervals + 1, 0)
+
+    owners, days = _explode_days(rules)
+    rows, months = _repeat_ranges(first_month[owners], counts[owners], intervals[owners])
+    event_rows = owners[rows]
+    days = days[rows]
+
+    month_start = months.astype("datetime64[M]").astype("datetime64[D]")
+    month_length = ((months + 1).astype("datetime64[M]").astype("datetime64[D]") - month_start) // _DAY
+    days = np.where(use_last_day[event_rows], np.minimum(days, month_length), days)
+    time_of_day = query_start - query_start.astype("datetime64[D]")
+    dates = month_start + (days - 1) * _DAY + time_of_day
+
+    valid = (
+        (days <= month_length)
+        & (dates >= np.maximum(starts[event_rows], query_start))
+        & (dates <= limits[event_rows])
+    )
+
+    return event_rows[valid], dates[valid]
@@ -0,0 +1,120 @@
+"""
+Columnar export of occurrences to Parquet or Arrow IPC files.
+
+Requires `pyarrow`. Text columns are dictionary-encoded (categoricals in pandas) and datasets can
+be partitioned by user or by month. Files are reopened memory-mapped, so uncompressed Arrow IPC
+files are read without copying.
+"""
+from datetime import datetime
+from typing import List, Optional, Sequence, Union
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs
+from .event import Event
+from .occurrence_engine import CATEGORICAL_COLUMNS, OCCURRENCE_COLUMNS, expand_occurrences
+
+EXPORT_FORMATS = ("parquet", "ipc")
+
+# partition_by value => partition column
+PARTITION_COLUMNS = {
+    "user": "user_id",
+    "month": "month"  # Added on export, as "YYYY-MM"
+}
+
+
+# events | list[Event], start, end | datetime => table | pa.Table
+def occurrences_table(events: Sequence[Event], start: datetime, end: datetime) -> pa.Table:
+    """
+    Expands the occurrences of the events straight into an Arrow table, without a pandas DataFrame.
+
+    Columns follow `OCCURRENCE_COLUMNS`; name, transaction_type and user_id are dictionary-encoded.
+    """
+    columns = expand_occurrences(events, start, end)
+
+    arrays = []
+    for column in OCCURRENCE_COLUMNS:
+        if column in CATEGORICAL_COLUMNS:
+            # Typed as strings so columns without any value (e.g. user_id of plain Events) can be written
+            arrays.append(pa.array(columns[column], type=pa.string(), from_pandas=True).dictionary_encode())
+        else:
+            arrays.append(pa.array(columns[column], from_pandas=True))
+
+    return pa.Table.from_arrays(arrays, names=OCCURRENCE_COLUMNS)
+
+
+def write_occurrences(
+        data: Union[pa.Table, pd.DataFrame],
+        path: str,
+        format: str = "parquet",
+        partition_by: Optional[str] = None
+) -> None:
+    """
+    Writes occurrences to a dataset directory, replacing the partitions being written.
+
+    :param data: Occurrences as returned by `occurrences_table`, `get_occurrence_df` or `project_users`.
+    :param path: Directory of the dataset.
+    :param format: "parquet" or "ipc" (Arrow IPC/Feather, uncompressed for zero-copy reads).
+    :param partition_by: None, "user" or "month". Partitions are written as `column=value` directories.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(EXPORT_FORMATS)}.")
+
+    if partition_by is not None and partition_by not in PARTITION_COLUMNS:
+        raise ValueError(f"Partition must be one of {', '.join(PARTITION_COLUMNS)}.")
+
+    table = data if isinstance(data, pa.Table) else pa.Table.from_pandas(data, preserve_index=False)
+
+    partitioning = None
+    if partition_by is not None:
+        column = PARTITION_COLUMNS[partition_by]
+        if column == "month":
+            table = table.append_column("month", pc.strftime(table["date"], format="%Y-%m").dictionary_encode())
+        partitioning = [column]
+
+    ds.write_dataset(
+        table,
+        path,
+        format=format,
+        partitioning=partitioning,
+        partitioning_flavor="hive" if partitioning else None,
+        existing_data_behavior="delete_matching"
+    )
+
+
+def open_occurrences(path: str, format: str = "parquet") -> ds.Dataset:
+    """
+    Opens an exported dataset with memory-mapped files.
+
+    Use `dataset.to_table(columns=..., filter=...)` to read only some columns or partitions.
+    """
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Format must be one of {', '.join(EXPORT_FORMATS)}.")
+
+    return ds.dataset(
+        path,
+        format=format,
+        filesystem=fs.LocalFileSystem(use_mmap=True),
+        partitioning="hive"
+    )
+
+
+def read_occurrence_df(
+        path: str,
+        format: str = "parquet",
+        columns: Optional[List[str]] = None,
+        filter: Optional[pc.Expression] = None
+) -> pd.DataFrame:
+    """
+    Reads an exported dataset back into a DataFrame with categorical and datetime64 columns.
+
+    :param path: Directory of the dataset.
+    :param format: Format used by `write_occurrences`.
+    :param columns: Columns to read. Defaults to every column.
+    :param filter: Optional filter, e.g. `pc.field("user_id") == "u1"`, which also prunes partitions.
+    """
+    df = open_occurrences(path, format).to_table(columns=columns, filter=filter).to_pandas()
+
+    # Partition columns are read as plain strings (Arrow can't merge dictionaries with a null partition)
+    return df.astype({column: "category" for column in PARTITION_COLUMNS.values() if column in df})
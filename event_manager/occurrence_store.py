@@ -0,0 +1,124 @@
+"""
+Materialized occurrence store.
+
+Keeps the expanded occurrences of every event for a rolling horizon, so repeated range queries
+become binary searches over already computed dates. Entries are filled lazily on the first query
+and dropped only for the affected event when `event_crud` updates one of its recurrence fields
+or deletes it.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Sequence
+import numpy as np
+import pandas as pd
+from .event import Event, RECURRENCE_FIELDS
+from .event_crud import add_change_listener, remove_change_listener
+from .instrumentation import incr
+from .occurrence_engine import OCCURRENCE_COLUMNS, OCCURRENCE_DTYPES, event_columns
+
+DEFAULT_HORIZON = timedelta(days=90)
+
+
+class _Entry(NamedTuple):
+    start: datetime  # First date covered by the expansion
+    end: datetime  # Last date covered by the expansion
+    dates: List[datetime]  # Sorted occurrences between start and end
+
+
+class OccurrenceStore:
+    """
+    In-process store of expanded occurrences, keyed by event ID.
+
+    Events without an ID (not stored yet) are always expanded directly.
+    """
+
+    def __init__(self, horizon: timedelta = DEFAULT_HORIZON, track_changes: bool = True):
+        """
+        :param horizon: Minimum span expanded past the start of a query, so that following
+                        queries over the next days are served from the store.
+        :param track_changes: If True, entries are invalidated by event_crud updates and deletes.
+        """
+        self.horizon = horizon
+        self._entries: Dict[int, _Entry] = {}
+        self._lock = threading.RLock()
+        self._track_changes = track_changes
+
+        if track_changes:
+            add_change_listener(self._on_change)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, event_id: int) -> bool:
+        return event_id in self._entries
+
+    def close(self) -> None:
+        """Stops tracking event_crud changes and empties the store."""
+        if self._track_changes:
+            remove_change_listener(self._on_change)
+            self._track_changes = False
+        self.clear()
+
+    def invalidate(self, event_id: int) -> None:
+        """Drops the stored occurrences of an event. They are re-expanded on the next query."""
+        with self._lock:
+            self._entries.pop(event_id, None)
+
+    def _on_change(self, event_id: int, fields: Optional[FrozenSet[str]]) -> None:
+        """event_crud listener: only deletes and recurrence changes move the stored dates."""
+        if fields is None or not fields.isdisjoint(RECURRENCE_FIELDS):
+            self.invalidate(event_id)
+
+    def clear(self) -> None:
+        """Drops every stored occurrence."""
+        with self._lock:
+            self._entries.clear()
+
+    # event | Event, start, end | datetime => dates | list[datetime]
+    def get_occurrences(self, event: Event, start: datetime, end: datetime) -> List[datetime]:
+        """Returns the same dates as `event.get_occurrences(start, end)`, reading them from the store."""
+        event_id = getattr(event, "id", None)
+        if event_id is None:
+            return event.get_occurrences(start, end)
+
+        with self._lock:
+            entry = self._entries.get(event_id)
+
+        # Stored dates keep the time of day of the query that expanded them
+        if entry is None or entry.start.time() != start.time() or entry.start > start or entry.end < end:
+            incr("cache_misses")
+            entry = self._expand(event, start, end, entry)
+        else:
+            incr("cache_hits")
+
+        return entry.dates[bisect_left(entry.dates, start):bisect_right(entry.dates, end)]
+
+    def get_occurrence_df(self, events: Sequence[Event], start: datetime, end: datetime) -> pd.DataFrame:
+        """Same as `utils.get_occurrence_df`, reading the occurrences from the store."""
+        positions = []
+        dates = []
+        for position, e in enumerate(events):
+            event_dates = self.get_occurrences(e, start, end)
+            positions.extend([position] * len(event_dates))
+            dates.extend(event_dates)
+
+        columns = event_columns(events, np.array(positions, dtype=np.int64))
+        columns["date"] = dates
+
+        incr("occurrences_produced", len(dates))
+        return pd.DataFrame(columns, columns=OCCURRENCE_COLUMNS).astype(OCCURRENCE_DTYPES)
+
+    def _expand(self, event: Event, start: datetime, end: datetime, entry: _Entry) -> _Entry:
+        """Expands the event over the query range plus the horizon, extending a compatible entry."""
+        window_start = start
+        window_end = max(end, start + self.horizon)
+        if entry is not None and entry.start.time() == start.time():
+            window_start = min(window_start, entry.start)
+            window_end = max(window_end, entry.end)
+
+        new_entry = _Entry(window_start, window_end, event.get_occurrences(window_start, window_end))
+        with self._lock:
+            self._entries[event.id] = new_entry
+
+        return new_entry
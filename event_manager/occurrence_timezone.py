@@ -0,0 +1,211 @@
+"""
+Timezone-aware occurrence expansion.
+
+Stored dates are naive local wall times. An event with a `timezone` (IANA name, e.g. "Europe/Paris")
+recurs in that zone; other events recur in the zone of the query. Occurrences are expanded per zone on
+local calendar days, at the wall time of day of the query start (like the naive engine) or of the
+event start, then converted to UTC instants.
+
+Conversions never call tzinfo per row: the UTC offset transitions of a zone are computed once per
+year and cached, and local times are mapped to their offsets with one `searchsorted`.
+"""
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from .event import Event, get_zone
+from .occurrence_engine import OCCURRENCE_COLUMNS, RuleArrays, event_columns, expand_rule_dates, rule_arrays
+
+_SECOND = timedelta(seconds=1)
+
+
+@lru_cache(maxsize=1024)
+def _year_transitions(zone: str, year: int) -> Tuple[Tuple[datetime, int, int], ...]:
+    """
+    Returns the (UTC instant, offset before, offset after) of every offset change of the zone during
+    the year, offsets in seconds. Found by sampling the offset daily and bisecting to the second.
+    """
+    tzinfo = get_zone(zone)
+
+    def offset(instant: datetime) -> int:
+        return int(instant.astimezone(tzinfo).utcoffset().total_seconds())
+
+    transitions = []
+    day = datetime(year, 1, 1, tzinfo=timezone.utc)
+    end = datetime(year + 1, 1, 1, tzinfo=timezone.utc)
+    previous = offset(day)
+    while day < end:
+        following = day + timedelta(days=1)
+        current = offset(following)
+        if current != previous:
+            low, high = day, following  # The offset changes in (low, high]
+            while high - low > _SECOND:
+                middle = low + (high - low) / 2
+                if offset(middle) == previous:
+                    low = middle
+                else:
+                    high = middle
+            transitions.append((high.replace(tzinfo=None, microsecond=0), previous, current))
+            previous = current
+        day = following
+
+    return tuple(transitions)
+
+
+# zone | str, first_year, last_year | int => boundaries, offsets | ndarray, ndarray
+def zone_transitions(zone: str, first_year: int, last_year: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Returns the offset transitions of the zone between two years (inclusive), for `local_to_utc`.
+
+    :return: Tuple of (boundaries, offsets): local wall times (datetime64[us]) at which the offset
+             changes, and the offsets (timedelta64[us]) in effect before the first boundary, between
+             consecutive boundaries, and after the last one.
+    """
+    transitions = [t for year in range(first_year, last_year + 1) for t in _year_transitions(zone, year)]
+
+    if transitions:
+        initial = transitions[0][1]
+    else:
+        reference = datetime(first_year, 7, 1, tzinfo=timezone.utc).astimezone(get_zone(zone))
+        initial = int(reference.utcoffset().total_seconds())
+
+    # A local time maps to the offset before a transition until the wall clock reaches the transition
+    # in the later of both offsets: repeated times (fall back) take their first instant, and skipped
+    # times (spring forward) keep the previous offset, like datetime's fold=0.
+    boundaries = np.array(
+        [np.datetime64(instant, "us") + np.timedelta64(max(before, after), "s") for instant, before, after in transitions],
+        dtype="datetime64[us]"
+    )
+    offsets = np.array([initial] + [after for _, _, after in transitions], dtype="timedelta64[s]").astype("timedelta64[us]")
+
+    return boundaries, offsets
+
+
+def local_to_utc(local: np.ndarray, zone: str) -> np.ndarray:
+    """Converts naive local wall times (datetime64[us]) of a zone to naive UTC times."""
+    if not len(local):
+        return local
+
+    first_year = int(local.min().astype("datetime64[Y]").astype(np.int64)) + 1970 - 1
+    last_year = int(local.max().astype("datetime64[Y]").astype(np.int64)) + 1970 + 1
+    boundaries, offsets = zone_transitions(zone, first_year, last_year)
+
+    return local - offsets[np.searchsorted(boundaries, local, side="right")]
+
+
+def to_utc(moment: datetime, zone: str) -> datetime:
+    """Returns a naive UTC datetime; naive moments are local times of the zone."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=get_zone(zone))
+    return moment.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+# rules | RuleArrays, zones | ndarray, zone_names | list[str], start, end | datetime => positions, dates
+def expand_rule_instants(
+        rules: RuleArrays,
+        zones: np.ndarray,
+        zone_names: Sequence[str],
+        start: datetime,
+        end: datetime,
+        use_event_time: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Computes the occurrence instants of the rules between start and end (inclusive).
+
+    Rule i recurs in the zone zone_names[zones[i]] on local days, at the wall time of day of start
+    (the occurrences of `expand_rule_dates` in that zone), or of its own start with use_event_time.
+    Local times skipped by a DST change are moved forward by the change, and repeated ones happen once.
+
+    :param start: Aware start of the range (naive values are taken as UTC).
+    :param end: Aware end of the range.
+    :param use_event_time: If True, occurrences take the time of day of their rule start.
+    :return: Tuple of (rule positions, occurrence instants as naive UTC datetime64[us]),
+             sorted by position and then by date.
+    """
+    start, end = _aware(start, "UTC"), _aware(end, "UTC")
+    time_of_day = start.replace(tzinfo=None) - datetime.combine(start.date(), datetime.min.time())
+    start_utc = np.datetime64(to_utc(start, "UTC"), "us")
+    end_utc = np.datetime64(to_utc(end, "UTC"), "us")
+
+    positions = []
+    instants = []
+    for code in np.unique(zones):
+        group = np.flatnonzero(zones == code)
+        zone = zone_names[code]
+        tzinfo = get_zone(zone)
+
+        # Local days that may hold an instant of the range (a day of margin covers any offset change)
+        first_day = datetime.combine(start.astimezone(tzinfo).date(), datetime.min.time()) - timedelta(days=1)
+        last_day = datetime.combine(end.astimezone(tzinfo).date(), datetime.min.time()) + timedelta(days=1)
+
+        group_rules = rules.take(group)
+        if use_event_time:
+            # Expand whole local days, then place every occurrence at the time of day of its rule start
+            day_starts = group_rules.starts.astype("datetime64[D]").astype("datetime64[us]")
+            day_rules = group_rules._replace(
+                starts=day_starts,
+                ends=group_rules.ends.astype("datetime64[D]").astype("datetime64[us]")
+            )
+            group_positions, days = expand_rule_dates(day_rules, first_day, last_day)
+
+            local = days + (group_rules.starts - day_starts)[group_positions]
+            ends = group_rules.ends[group_positions]
+            selected = np.isnat(ends) | (local <= ends)
+        else:
+            group_positions, local = expand_rule_dates(group_rules, first_day + time_of_day, last_day + time_of_day)
+            selected = np.ones(len(local), dtype=bool)
+
+        utc = local_to_utc(local, zone)
+        selected &= (utc >= start_utc) & (utc <= end_utc)
+        positions.append(group[group_positions[selected]])
+        instants.append(utc[selected])
+
+    if not positions:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[us]")
+
+    positions = np.concatenate(positions)
+    instants = np.concatenate(instants)
+    order = np.lexsort((instants, positions))
+
+    return positions[order], instants[order]
+
+
+def event_zones(events: Sequence[Event], tz: str) -> Tuple[np.ndarray, List[str]]:
+    """Returns (zone code per event, zone names) using each event's timezone, or tz when it has none."""
+    codes: Dict[str, int] = {}
+    zones = np.array(
+        [codes.setdefault(getattr(event, "timezone", None) or tz, len(codes)) for event in events],
+        dtype=np.int64
+    )
+    return zones, list(codes)
+
+
+# events | list[Event], start, end | datetime, tz | str => columns | dict[str, ndarray]
+def expand_occurrences_tz(
+        events: Sequence[Event],
+        start: datetime,
+        end: datetime,
+        tz: str,
+        use_event_time: bool = False
+) -> Dict[str, np.ndarray]:
+    """
+    Same as `occurrence_engine.expand_occurrences`, in local time: events recur in their own timezone,
+    or in tz when they have none. start and end are local times of tz when naive. With use_event_time,
+    occurrences take the time of day of the event start instead of the one of start.
+
+    The date column holds naive UTC instants (datetime64[ns]); see `utils.get_occurrence_df` for
+    a DataFrame in tz.
+    """
+    zones, zone_names = event_zones(events, tz)
+    positions, instants = expand_rule_instants(
+        rule_arrays(events), zones, zone_names, _aware(start, tz), _aware(end, tz), use_event_time
+    )
+
+    columns = event_columns(events, positions)
+    columns["date"] = instants.astype("datetime64[ns]")
+
+    return {column: columns[column] for column in OCCURRENCE_COLUMNS}
+
+
+def _aware(moment: datetime, tz: str) -> datetime:
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=get_zone(tz))
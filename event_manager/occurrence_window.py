@@ -0,0 +1,285 @@
+"""
+Incremental occurrence projection over a sliding window.
+
+`OccurrenceWindow` holds a list of events and the occurrences of its last window. When the window
+moves (e.g. a dashboard stepping forward one day or week), only the newly covered days are expanded
+and the expired days are dropped, so a refresh costs O(new days) of expansion instead of O(window).
+Events changed through `event_crud` are reloaded on the next refresh, and re-expanded when their
+recurrence changed.
+"""
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import pandas as pd
+from sqlalchemy import select
+from sqlalchemy.orm import with_polymorphic
+from .db_session import session_scope
+from .event import Event, RECURRENCE_FIELDS
+from .event_crud import add_change_listener, remove_change_listener
+from .instrumentation import incr, timed
+from .occurrence_engine import (
+    CATEGORICAL_COLUMNS, OCCURRENCE_COLUMNS, OCCURRENCE_DTYPES, RuleArrays, _as_array, event_column_values,
+    expand_rule_dates, rule_arrays
+)
+
+_DAY = timedelta(days=1)
+
+# Loads subclass columns (e.g. Transaction.amount) along with the base Event columns
+_any_event = with_polymorphic(Event, "*")
+
+
+class OccurrenceWindow:
+    """
+    Stateful projector of the occurrences of a list of events over a moving date range.
+
+    Occurrences keep the time of day of the first window start, so windows whose start differs by a
+    whole number of days are updated incrementally; any other window is recomputed from scratch.
+    `get_occurrence_df` returns the same rows, in the same order, as `utils.get_occurrence_df`
+    (categoricals may list values of events without occurrences in the window).
+    """
+
+    def __init__(self, events: Iterable[Event] = (), track_changes: bool = True):
+        """
+        :param events: Events (or subclasses, or snapshots) to project.
+        :param track_changes: If True, events updated or deleted through event_crud are reloaded
+                              from the database (or dropped) on the next refresh.
+        """
+        self._events: List[Optional[Event]] = []  # Slot => event, None once removed
+        self._slots_by_id: Dict[int, int] = {}  # Event ID => slot
+        self._stale: Set[int] = set()  # Slots to re-expand over the whole window
+        self._changed_ids: Dict[int, bool] = {}  # IDs reported by event_crud since the last refresh => recurrence changed
+
+        # Rebuilt after the events change: rules of the live slots, and per-slot column values
+        self._rules: Optional[Tuple[np.ndarray, RuleArrays]] = None
+        self._columns: Optional[Dict[str, Tuple[np.ndarray, Optional[pd.Index]]]] = None
+
+        self._anchor: Optional[datetime] = None  # Occurrences fall on anchor + k days
+        self._days: Optional[Tuple[int, int]] = None  # Range of k covered by the stored rows
+        self._slots = np.empty(0, dtype=np.int64)
+        self._dates = np.empty(0, dtype="datetime64[us]")
+
+        self._lock = threading.RLock()
+        self._track_changes = track_changes
+
+        for event in events:
+            self._add(event)
+
+        if track_changes:
+            add_change_listener(self._on_change)
+
+    def __len__(self) -> int:
+        return len(self._events) - self._events.count(None)
+
+    def __iter__(self):
+        return iter([event for event in self._events if event is not None])
+
+    @property
+    def window(self) -> Optional[Tuple[datetime, datetime]]:
+        """First and last day covered by the stored occurrences, or None before the first refresh."""
+        if self._days is None:
+            return None
+        return self._anchor + self._days[0] * _DAY, self._anchor + self._days[1] * _DAY
+
+    def close(self) -> None:
+        """Stops tracking event_crud changes."""
+        if self._track_changes:
+            remove_change_listener(self._on_change)
+            self._track_changes = False
+
+    def add(self, event: Event) -> None:
+        """Adds an event; its occurrences are computed on the next refresh."""
+        with self._lock:
+            self._add(event)
+
+    def update(self, event: Event) -> None:
+        """Replaces the event having the same ID (or the same object), e.g. after its rule changed."""
+        with self._lock:
+            slot = self._slot(event)
+            if slot is None:
+                self._add(event)
+            else:
+                self._replace(slot, event)
+
+    def remove(self, event: Event) -> bool:
+        """Removes an event and its occurrences. Returns True if it was projected."""
+        with self._lock:
+            slot = self._slot(event)
+            if slot is None:
+                return False
+
+            self._drop(slot)
+            return True
+
+    # start, end | datetime => df | pd.DataFrame
+    @timed("occurrence_window_get_occurrence_df")
+    def get_occurrence_df(self, start: datetime, end: datetime) -> pd.DataFrame:
+        """
+        Moves the window to [start, end] and returns its occurrences, with the columns and dtypes of
+        `utils.get_occurrence_df`. Only the days not covered by the previous window are expanded.
+        """
+        with self._lock:
+            self._reload_changed()
+            self._move(start, end)
+
+            slots = self._slots
+            data = {"date": self._dates.astype("datetime64[ns]")}
+            for column, (values, categories) in self._column_values().items():
+                if categories is None:
+                    data[column] = values[slots]
+                else:
+                    data[column] = pd.Categorical.from_codes(values[slots], categories=categories)
+
+        df = pd.DataFrame(data, columns=OCCURRENCE_COLUMNS).astype(OCCURRENCE_DTYPES)
+        incr("occurrences_produced", len(df))
+        return df
+
+    def _move(self, start: datetime, end: datetime) -> None:
+        """Updates the stored rows to cover [start, end], expanding only the missing days."""
+        if self._days is None or (start - self._anchor) % _DAY or start > end:
+            # First window, or a time of day that doesn't line up with the stored occurrences
+            self._anchor = start
+            self._days = None
+
+        first = (start - self._anchor) // _DAY
+        last = (end - self._anchor) // _DAY  # Occurrences fall on anchor + k days, so this is the last one before end
+
+        if self._days is None:
+            self._slots, self._dates = self._expand_all(first, last)
+            self._days = (first, last)
+            self._stale.clear()
+            return
+
+        covered_first, covered_last = self._days
+        kept_first, kept_last = max(first, covered_first), min(last, covered_last)
+
+        keep = (
+            (self._dates >= np.datetime64(self._anchor + kept_first * _DAY, "us"))
+            & (self._dates <= np.datetime64(self._anchor + kept_last * _DAY, "us"))
+        )
+        if self._stale:
+            keep &= ~np.isin(self._slots, list(self._stale))
+
+        # Segments in chronological order for every slot, so a stable sort by slot keeps dates sorted
+        segments = [
+            self._expand_all(first, min(last, covered_first - 1)),
+            self._expand_slots(sorted(self._stale), kept_first, kept_last),
+            (self._slots[keep], self._dates[keep]),
+            self._expand_all(max(first, covered_last + 1), last)
+        ]
+        slots = np.concatenate([segment[0] for segment in segments])
+        dates = np.concatenate([segment[1] for segment in segments])
+        order = np.argsort(slots, kind="stable")
+
+        self._slots, self._dates = slots[order], dates[order]
+        self._days = (first, last)
+        self._stale.clear()
+
+    def _expand_all(self, first: int, last: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Occurrences of every event from day first to day last (inclusive), as (slots, dates)."""
+        if first > last:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[us]")
+
+        if self._rules is None:
+            live = [slot for slot, event in enumerate(self._events) if event is not None]
+            self._rules = np.array(live, dtype=np.int64), rule_arrays([self._events[slot] for slot in live])
+
+        live, rules = self._rules
+        positions, dates = expand_rule_dates(rules, self._anchor + first * _DAY, self._anchor + last * _DAY)
+        return live[positions], dates
+
+    def _expand_slots(self, slots: List[int], first: int, last: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Same as _expand_all, for a few slots."""
+        if first > last or not slots:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype="datetime64[us]")
+
+        rules = rule_arrays([self._events[slot] for slot in slots])
+        positions, dates = expand_rule_dates(rules, self._anchor + first * _DAY, self._anchor + last * _DAY)
+        return np.array(slots, dtype=np.int64)[positions], dates
+
+    def _column_values(self) -> Dict[str, Tuple[np.ndarray, Optional[pd.Index]]]:
+        """Per-slot values of the non-date columns: (values, None), or (codes, categories) for categoricals."""
+        if self._columns is None:
+            self._columns = {}
+            for column, values in event_column_values(self._events).items():
+                if column in CATEGORICAL_COLUMNS:
+                    codes, categories = pd.factorize(np.array(values, dtype=object), sort=True)
+                    self._columns[column] = codes, categories
+                else:
+                    self._columns[column] = _as_array(values), None
+
+        return self._columns
+
+    def _add(self, event: Event) -> None:
+        slot = self._slot(event)
+        if slot is not None:
+            self._replace(slot, event)
+            return
+
+        slot = len(self._events)
+        self._events.append(event)
+        event_id = getattr(event, "id", None)
+        if event_id is not None:
+            self._slots_by_id[event_id] = slot
+
+        self._stale.add(slot)
+        self._rules = self._columns = None
+
+    def _replace(self, slot: int, event: Event) -> None:
+        self._events[slot] = event
+        self._stale.add(slot)
+        self._rules = self._columns = None
+
+    def _drop(self, slot: int) -> None:
+        event_id = getattr(self._events[slot], "id", None)
+        if event_id is not None:
+            self._slots_by_id.pop(event_id, None)
+
+        self._events[slot] = None
+        self._stale.discard(slot)
+        self._rules = self._columns = None
+
+        keep = self._slots != slot
+        self._slots, self._dates = self._slots[keep], self._dates[keep]
+
+    def _slot(self, event: Event) -> Optional[int]:
+        event_id = getattr(event, "id", None)
+        if event_id is not None:
+            return self._slots_by_id.get(event_id)
+
+        for slot, held in enumerate(self._events):
+            if held is event:
+                return slot
+        return None
+
+    def _on_change(self, event_id: int, fields: Optional[FrozenSet[str]]) -> None:
+        """event_crud listener: the event was updated (fields) or deleted (None)."""
+        with self._lock:
+            if event_id in self._slots_by_id:
+                recurrence_changed = fields is None or not fields.isdisjoint(RECURRENCE_FIELDS)
+                self._changed_ids[event_id] = self._changed_ids.get(event_id, False) or recurrence_changed
+
+    def _reload_changed(self) -> None:
+        """Reloads the events reported by event_crud with one query, dropping the deleted ones."""
+        if not self._changed_ids:
+            return
+
+        changed, self._changed_ids = self._changed_ids, {}
+        ids = list(changed)
+
+        with session_scope() as session:
+            loaded = {event.id: event for event in session.scalars(select(_any_event).where(_any_event.id.in_(ids)))}
+            session.expunge_all()  # Keep the loaded values readable after the session closes
+
+        for event_id in ids:
+            slot = self._slots_by_id.get(event_id)
+            if slot is None:
+                continue
+            if event_id not in loaded:
+                self._drop(slot)
+            elif changed[event_id]:
+                self._replace(slot, loaded[event_id])
+            else:
+                # Same occurrences: only the per-slot values (name, amount...) are rebuilt
+                self._events[slot] = loaded[event_id]
+                self._columns = None
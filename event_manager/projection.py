@@ -0,0 +1,128 @@
+"""
+Parallel occurrence projection for many users.
+
+Transactions are fetched for all users with a few bulk queries, split into shards of whole users
+and expanded across a process pool. Workers receive plain tuples with the SNAPSHOT_COLUMNS values
+(never ORM objects) and send back the columnar arrays of the vectorized occurrence engine.
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import datetime
+from itertools import repeat
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+import pandas as pd
+from .db_session import session_scope
+from .event_extensions import TransactionSnapshot, users_transactions_query
+from .instrumentation import incr, timed
+from .occurrence_engine import OCCURRENCE_COLUMNS, OCCURRENCE_DTYPES, expand_occurrences
+
+DEFAULT_QUERY_BATCH_SIZE = 500  # User IDs per bulk query
+DEFAULT_SHARD_SIZE = 5000  # Transactions per worker task (users are never split)
+
+RuleRow = Tuple  # SNAPSHOT_COLUMNS values of one transaction, in TransactionSnapshot constructor order
+
+
+# user_ids | list[str], start, end | datetime => rows | dict[str, list[tuple]]
+@timed("fetch_rule_rows")
+def fetch_rule_rows(
+        user_ids: Sequence[str],
+        start: datetime,
+        end: datetime,
+        batch_size: int = DEFAULT_QUERY_BATCH_SIZE
+) -> Dict[str, List[RuleRow]]:
+    """
+    Fetches the transactions of many users overlapping the period, with one query per batch of user IDs.
+
+    :return: Dictionary of user ID => plain column tuples, for the users having transactions.
+    """
+    if batch_size < 1:
+        raise ValueError("Batch size must be a positive integer.")
+
+    rows = {}
+    with session_scope() as session:
+        for i in range(0, len(user_ids), batch_size):
+            for row in session.execute(users_transactions_query(user_ids[i:i + batch_size], start, end)):
+                rows.setdefault(row.user_id, []).append(tuple(row))
+
+    incr("db_rows_fetched", sum(len(user_rows) for user_rows in rows.values()))
+    return rows
+
+
+@timed("project_users")
+def project_users(
+        user_ids: Iterable[str],
+        start: datetime,
+        end: datetime,
+        *,
+        per_user: bool = False,
+        max_workers: Optional[int] = None,
+        shard_size: int = DEFAULT_SHARD_SIZE,
+        executor: Optional[Executor] = None
+) -> Union[pd.DataFrame, Dict[str, pd.DataFrame]]:
+    """
+    Computes the occurrences of the transactions of every user between start and end.
+
+    Gives the same rows as calling `get_user_transactions` and `get_occurrence_df` for each user,
+    grouped by user. Scripts using the process pool must run it under `if __name__ == "__main__":`.
+
+    :param user_ids: Users to project.
+    :param start: Start of the date range.
+    :param end: End of the date range.
+    :param per_user: If True, returns a dictionary of user ID => DataFrame (empty for users without occurrences).
+    :param max_workers: Worker processes. Defaults to the CPU count; 1 expands everything in this process.
+    :param shard_size: Approximate number of transactions sent to a worker at once.
+    :param executor: Optional executor to reuse (e.g. across nightly batches) instead of starting a pool.
+    :return: DataFrame with the same columns as `get_occurrence_df`, or one per user.
+    """
+    if shard_size < 1:
+        raise ValueError("Shard size must be a positive integer.")
+
+    user_ids = list(dict.fromkeys(str(user_id) for user_id in user_ids))
+    shards = _shard_rows(fetch_rule_rows(user_ids, start, end), shard_size)
+
+    if executor is not None:
+        results = list(executor.map(_expand_shard, shards, repeat(start), repeat(end)))
+    elif max_workers == 1 or len(shards) <= 1:
+        results = [_expand_shard(shard, start, end) for shard in shards]
+    else:
+        workers = min(max_workers or os.cpu_count() or 1, len(shards))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_expand_shard, shards, repeat(start), repeat(end)))
+
+    if not results:
+        results = [expand_occurrences([], start, end)]
+
+    df = pd.DataFrame(
+        {column: np.concatenate([result[column] for result in results]) for column in OCCURRENCE_COLUMNS},
+        columns=OCCURRENCE_COLUMNS
+    ).astype(OCCURRENCE_DTYPES)
+
+    incr("occurrences_produced", len(df))
+
+    if not per_user:
+        return df
+
+    frames = {user_id: group.reset_index(drop=True) for user_id, group in df.groupby("user_id", sort=False, observed=True)}
+    return {user_id: frames.get(user_id, df.iloc[0:0]) for user_id in user_ids}
+
+
+def _shard_rows(rows: Dict[str, List[RuleRow]], shard_size: int) -> List[List[RuleRow]]:
+    """Packs the rows of whole users into shards of about shard_size rows."""
+    shards = []
+    current = []
+    for user_rows in rows.values():
+        current.extend(user_rows)
+        if len(current) >= shard_size:
+            shards.append(current)
+            current = []
+
+    if current:
+        shards.append(current)
+
+    return shards
+
+
+def _expand_shard(rows: List[RuleRow], start: datetime, end: datetime) -> Dict[str, np.ndarray]:
+    """Worker task: rebuilds lightweight snapshots from the tuples and expands them."""
+    return expand_occurrences([TransactionSnapshot(*row) for row in rows], start, end)
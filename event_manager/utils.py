@@ -1,18 +1,28 @@
+import heapq
 from datetime import datetime, timedelta
+import numpy as np
 import pandas as pd
-from event import Event, EventDict
-from typing import List, Union, Dict
+from .event import Event, EventDict
+from .event_index import EventIndex
+from .instrumentation import incr, timed
+from .occurrence_cache import OccurrenceCache
+from .occurrence_engine import CATEGORICAL_COLUMNS, OCCURRENCE_COLUMNS, OCCURRENCE_DTYPES, expand_occurrences
+from .occurrence_timezone import expand_occurrences_tz
+from typing import Dict, Iterator, List, Optional, Union
 import logging
 
-# event parameters | dic , week_limit | 48 int =>  week_start_date(week_limit) | list
-def get_event_weeks(event: Union[Event, EventDict], week_limit=48):
+_DAY = np.timedelta64(1, "D")
+
+# event parameters | dic , week_limit | 48 int =>  week_start_date(week_limit) | ndarray
+def get_event_weeks(event: Union[Event, EventDict], week_limit=48, seed: Optional[int] = None) -> np.ndarray:
     """
-    Determines event recurrence and returns a list of weeks (Mondays) when the event occurs.
+    Determines event recurrence and returns the weeks (Mondays) when the event occurs.
     Supports both Event objects and dictionary-based event representations.
 
     :param event: An Event instance or a dictionary containing event data.
     :param week_limit: Number of weeks to retrieve.
-    :return: List of week start dates.
+    :param seed: Optional seed to randomly sample the middle weeks. If None, they are evenly spaced.
+    :return: Sorted datetime64 array of week start dates.
     """
     if isinstance(event, dict):
         event = Event(
@@ -38,130 +48,155 @@ def get_event_weeks(event: Union[Event, EventDict], week_limit=48):
     elif interval != 1:
         raise ValueError(f"Interval can't be greater than 1 month.")
 
+    start = np.datetime64(start_date, "us")
+    end = np.datetime64(end_date, "us")
 
     if recurrent_type == "weekly":
-        start_date = start_date - timedelta(days=start_date.weekday())  # Ensure start_date aligns to Monday
-        date_range = pd.date_range(start=start_date, end=end_date, freq=f'{interval * 7}D')
-        relevant_weeks_df = pd.DataFrame(date_range, columns=['week_start_date'])
-
+        week_start = start - _weekdays(start) * _DAY  # Ensure start_date aligns to Monday
+        relevant_weeks = np.arange(week_start, end + np.timedelta64(1, "us"), interval * 7 * _DAY)
 
     elif recurrent_type == "monthly":
-        days = event.days
-        date_range = pd.date_range(start=start_date, end=end_date)
-        relevant_dates = {date for date in date_range if date.day in days}
-
-        # Apply interval filtering
-        relevant_months = []
-        last_added_month = None
-        for date in sorted(relevant_dates):
-            if last_added_month is None or (date.year * 12 + date.month) >= last_added_month + interval:
-                relevant_months.append(date)
-                last_added_month = date.year * 12 + date.month
+        # One candidate per month per day of the month, keeping the time of day of start_date
+        months = np.arange(start.astype("datetime64[M]"), end.astype("datetime64[M]") + 1)
+        month_starts = months.astype("datetime64[D]")
+        month_lengths = ((months + 1).astype("datetime64[D]") - month_starts) // _DAY
+        days = np.unique(np.asarray(event.days, dtype=np.int64))
 
-        relevant_weeks = [date - timedelta(days=date.weekday()) for date in relevant_months]
+        candidates = month_starts[:, None] + (days[None, :] - 1) * _DAY + (start - start.astype("datetime64[D]"))
+        valid = (days[None, :] <= month_lengths[:, None]) & (candidates >= start) & (candidates <= end)
 
+        # Only the first occurrence of each month is kept (monthly events always recur every month)
+        has_occurrence = valid.any(axis=1)
+        first_day = valid.argmax(axis=1) if days.size else np.zeros(len(months), dtype=np.int64)
+        relevant_dates = candidates[has_occurrence, first_day[has_occurrence]]
 
-        relevant_weeks_df = pd.DataFrame(relevant_weeks, columns=["week_start_date"])
+        relevant_weeks = relevant_dates - _weekdays(relevant_dates) * _DAY
 
     else:
         raise ValueError("Unknown recurrent type")
 
-    return _get_batched_weeks(relevant_weeks_df, week_limit)['week_start_date'].tolist()
+    return _get_batched_weeks(relevant_weeks.astype("datetime64[us]"), week_limit, seed)
 
-# week_start_date | DateFrame =>  batch_records(sample_size) | DataFrame
-def _get_batched_weeks(df, sample_size):
+def _weekdays(dates):
+    """Returns the weekday (0 = Monday) of a datetime64 value or array."""
+    return (dates.astype("datetime64[D]").astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+
+# week_start_date | ndarray =>  batch_records(sample_size) | ndarray
+def _get_batched_weeks(weeks: np.ndarray, sample_size: int, seed: Optional[int] = None) -> np.ndarray:
     """
-    Returns the first and last batch_size rows, and the evenly
-    distribute batch_size rows in the middle of the DataFrame.
+    Returns the first and last batch_size weeks, and batch_size weeks
+    from the middle of the array.
+
+    The middle weeks are evenly spaced, which keeps the result deterministic and cacheable.
+    If a seed is given, they are randomly sampled with it instead.
 
-    :param df: DataFrame with dates.
-    :param sample_size: total number of rows to sample.
-    :return: DataFrame with selected rows.
+    :param weeks: Sorted datetime64 array with dates.
+    :param sample_size: total number of weeks to sample.
+    :param seed: Optional seed for random sampling of the middle weeks.
+    :return: Sorted datetime64 array with the selected weeks.
     """
 
     batch_size = sample_size // 3
 
+    if len(weeks) <= sample_size:
+        logging.debug("=> Week count (%s) is less than or equal to sample size (%s)", len(weeks), sample_size)
+        return weeks  # If there are not enough weeks.
 
-    if len(df) <= sample_size:
-        logging.debug(f"\n=> Week count ({len(df)}) is less than or equal to sample size ({sample_size})")
-        logging.debug("<= Returning all weeks.")
-        return df  # If there are not enough rows.
+    logging.debug("Batching %s weeks | In 3 batches of %s weeks | Sample size: %s", len(weeks), batch_size, sample_size)
+    middle = weeks[batch_size:len(weeks) - batch_size]
 
-    logging.debug(f"\nBatching {len(df)} weeks | In 3 batches of {batch_size} weeks | Sample size: {sample_size}")
-    first_n = df.head(batch_size)
-    last_n = df.tail(batch_size)
-    middle_n = df.iloc[batch_size:-batch_size].sample(n=batch_size)
-    batch_df = pd.concat([first_n, middle_n, last_n]).sort_values(by='week_start_date').reset_index(drop=True)
-    logging.debug(f"<= Returning {len(batch_df)} weeks.")
+    if seed is None:
+        middle = middle[np.linspace(0, len(middle) - 1, batch_size).round().astype(np.int64)]
+    else:
+        middle = np.sort(np.random.default_rng(seed).choice(middle, size=batch_size, replace=False))
+
+    batch = np.concatenate([weeks[:batch_size], middle, weeks[len(weeks) - batch_size:]])
+    logging.debug("<= Returning %s weeks.", len(batch))
 
-    return batch_df
+    return batch
 
-# start_date, end_date | datetime, event_list | list[Event] => events | list[Event]
-def get_events_in_range(event_list: List[Event], start_date: datetime, end_date: datetime = None, week_limit = 52) -> List[Event]:
+# start_date, end_date | datetime, event_list | list[Event] or EventIndex => events | list[Event]
+def get_events_in_range(event_list: Union[List[Event], EventIndex], start_date: datetime, end_date: datetime = None, week_limit = 52) -> List[Event]:
     """
     Returns all events that may occur within the given date range.
     Default implementation: Filters events in memory.
     Should be overridden in ORM-based implementations for better performance.
+
+    When `event_list` is an EventIndex, the index is queried instead of scanning every event,
+    and the events are returned sorted by start date.
     """
     if end_date is None:
         end_date = start_date + timedelta(weeks=week_limit)  # Default max 1-year range if no end date
-        logging.debug(f"! No end_date specified, using {end_date.strftime('%Y-%m-%d')} ({week_limit} weeks from start_date)")
-
-    logging.debug(f"=> Getting events for {start_date.strftime('%Y-%b-%d')} to {end_date.strftime('%Y-%b-%d')}")
+        logging.debug("! No end_date specified, using %s (%s weeks from start_date)", end_date, week_limit)
 
-    # Debug
-    for event in event_list:
-        logging.debug(f"\nChecking {event.name}")
+    logging.debug("=> Getting events for %s to %s", start_date, end_date)
 
-        if event.start_date <= end_date:
-            logging.debug(f"1 | Met: {event.start_date.strftime('%Y-%m-%d')} <=  {end_date.strftime('%Y-%m-%d')}")
-        else:
-            logging.debug(f"1 | Not Met: {event.start_date.strftime('%Y-%m-%d')} >  {end_date.strftime('%Y-%m-%d')}")
-
-        event_end_date = event.end_date.strftime('%Y-%m-%d') if event.end_date is not None else None
+    if isinstance(event_list, EventIndex):
+        events = event_list.query(start_date, end_date)
+    else:
+        events = [
+            event for event in event_list
+            if event.occurs_on_range(start_date, end_date)
+        ]
+        incr("events_scanned", len(event_list))
 
-        if event.end_date is None or event.end_date >= start_date:
+    incr("events_matched", len(events))
 
-            logging.debug(f"2 | Met:{event_end_date} is none or >= {start_date.strftime('%Y-%m-%d')}")
-        else:
-            logging.debug(f"2 | Not Met:{event_end_date} is < {start_date.strftime('%Y-%m-%d')}")
+    logging.debug("<= Returning %s events.", len(events))
 
-    events =  [
-        event for event in event_list
-        if event.occurs_on_range(start_date,end_date)
-    ]
+    return events
 
-    logging.debug(f"<= Returning {len(events)} events.")
+@timed("count_weekly_events")
+def count_weekly_events(event_param, existing_events: Union[List[Event], EventIndex]) -> Dict:
+    """
+    Counts how many times the existing events occur during each week the given event occurs.
 
-    return events
+    The occurrences of every relevant event are generated once over the whole span of weeks and
+    bucketed by the Monday of their week, so the cost follows the number of occurrences.
 
-def count_weekly_events(event_param,existing_events: List[Event]) -> Dict:
+    :param event_param: Dictionary with the data of the new event (see EventDict).
+    :param existing_events: Events to count, either as a list or as a precomputed EventIndex.
+    :return: Dictionary of week start date => number of occurrences during that week.
+    """
     start_date = event_param["start_date"]
     end_date = event_param.get("end_date", None)
 
-    relevant_weeks = get_event_weeks(event_param)
+    relevant_weeks = get_event_weeks(event_param).tolist()
     relevant_events = get_events_in_range(
         event_list= existing_events,
         start_date= start_date,
         end_date= end_date
     )
 
-    weekly_count = {}
-    for week_date in relevant_weeks:
-        week_start = week_date - timedelta(days=week_date.weekday())
-        week_end = week_date + timedelta(days=6)
-        week_count = 0
+    if not relevant_weeks:
+        return {}
 
-        for date in pd.date_range(start=week_start, end=week_end):
-            for event in relevant_events:
-                week_count += 1 if event.occurs_on(date) else 0
+    # Week start (Monday) => occurrences during that week
+    buckets = {week_date - timedelta(days=week_date.weekday()): 0 for week_date in relevant_weeks}
+    window_start = min(buckets)
+    window_end = max(buckets) + timedelta(days=6)
 
-        weekly_count[week_date] = week_count
+    for event in relevant_events:
+        for date in event.iter_occurrences(window_start, window_end):
+            week_start = date - timedelta(days=date.weekday())
+            if week_start in buckets:
+                buckets[week_start] += 1
 
-    return weekly_count
+    return {
+        week_date: buckets[week_date - timedelta(days=week_date.weekday())]
+        for week_date in relevant_weeks
+    }
 
 # This is the main function to retrieve event occurrences
-def get_occurrence_df(events: List[Event], start: datetime, end: datetime) -> pd.DataFrame:
+@timed("get_occurrence_df")
+def get_occurrence_df(
+        events: List[Event],
+        start: datetime,
+        end: datetime,
+        cache: Optional[OccurrenceCache] = None,
+        tz: Optional[str] = None,
+        use_event_time: bool = False
+) -> pd.DataFrame:
     """
    Given a list of events or transactions, returns a DataFrame where each row
     represents a single occurrence of an event within the given date range.
@@ -173,23 +208,120 @@ def get_occurrence_df(events: List[Event], start: datetime, end: datetime) -> pd
     - amount (if present)
     - transaction_type (if present)
     - user_id (if present)
+
+    date is datetime64[ns]; name, transaction_type and user_id are categoricals.
+    Occurrences are computed for all events at once by the vectorized occurrence engine,
+    or read from `cache` when given (see OccurrenceCache).
+
+    With tz (an IANA name, e.g. "Europe/Paris"), events recur in their own timezone, or in tz when
+    they have none, across DST changes; naive start and end are local times of tz and date is
+    datetime64[ns, tz]. Occurrences keep the wall time of day of start, unless use_event_time is
+    True: they then take the time of day of each event start. Not supported together with cache.
     """
-    rows = []
+    if use_event_time and tz is None:
+        raise ValueError("use_event_time requires a timezone.")
+
+    if tz is not None:
+        if cache is not None:
+            raise ValueError("Timezone-aware occurrences can't be read from an OccurrenceCache.")
+
+        columns = expand_occurrences_tz(events, start, end, tz, use_event_time)
+        df = pd.DataFrame(columns, columns=OCCURRENCE_COLUMNS).astype(
+            {column: OCCURRENCE_DTYPES[column] for column in CATEGORICAL_COLUMNS}
+        )
+        df["date"] = pd.DatetimeIndex(columns["date"]).tz_localize("UTC").tz_convert(tz)
+        incr("occurrences_produced", len(df))
+        return df
+
+    if cache is not None:
+        return cache.get_occurrence_df(events, start, end)
 
-    for e in events:
-        for date in e.get_occurrences(start, end):
-            rows.append({
-                "event_id": getattr(e, "id", None),
-                "name": getattr(e, "name", ""),
-                "date": date,
-                "amount": getattr(e, "amount", None),
-                "transaction_type": getattr(e, "transaction_type", None),
-                "user_id": getattr(e, "user_id", None)
-            })
+    df = pd.DataFrame(expand_occurrences(events, start, end), columns=OCCURRENCE_COLUMNS).astype(OCCURRENCE_DTYPES)
+    incr("occurrences_produced", len(df))
 
-    return pd.DataFrame(rows)
+    return df
+
+
+# Calendar period keys used to split streamed occurrences into chunks
+_PERIOD_KEYS = {
+    "day": lambda date: (date.year, date.month, date.day),
+    "week": lambda date: (date - timedelta(days=date.weekday())).date(),
+    "month": lambda date: (date.year, date.month),
+    "year": lambda date: date.year
+}
+
+# events | list[Event], start, end | datetime => occurrences | Iterator[dict]
+def iter_occurrences(events: List[Event], start: datetime, end: Optional[datetime] = None) -> Iterator[Dict]:
+    """
+    Lazily yields the occurrences of all events in chronological order.
 
+    Every event contributes its own lazy generator and the generators are merged with a heap,
+    so memory stays constant no matter how long the range is. Occurrences falling on the same
+    date keep the order of `events`.
+
+    :param events: Events or transactions to expand.
+    :param start: Start of the date range.
+    :param end: End of the date range. If None, open-ended events are streamed indefinitely.
+    :return: Iterator of dicts with the same columns as `get_occurrence_df`.
+    """
+    limit = end if end is not None else datetime.max
+
+    streams = [_tagged(e.iter_occurrences(start, limit), position, e) for position, e in enumerate(events)]
+
+    for date, _, e in heapq.merge(*streams, key=lambda item: (item[0], item[1])):
+        yield {
+            "event_id": getattr(e, "id", None),
+            "name": getattr(e, "name", ""),
+            "date": date,
+            "amount": getattr(e, "amount", None),
+            "transaction_type": getattr(e, "transaction_type", None),
+            "user_id": getattr(e, "user_id", None)
+        }
+
+def _tagged(dates: Iterator[datetime], position: int, event: Event) -> Iterator[tuple]:
+    """Yields (date, position, event) for every date, binding the event of each stream."""
+    for date in dates:
+        yield date, position, event
+
+def iter_occurrence_chunks(
+        events: List[Event],
+        start: datetime,
+        end: Optional[datetime] = None,
+        chunk_size: Optional[int] = None,
+        period: Optional[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    Streams occurrences as DataFrames of at most `chunk_size` rows and/or one calendar period each.
+
+    :param events: Events or transactions to expand.
+    :param start: Start of the date range.
+    :param end: End of the date range. If None, open-ended events are streamed indefinitely.
+    :param chunk_size: Maximum number of rows per DataFrame.
+    :param period: One of "day", "week", "month" or "year". Starts a new DataFrame whenever the period changes.
+    :return: Iterator of DataFrames with the same columns as `get_occurrence_df`.
+    """
+    if chunk_size is None and period is None:
+        raise ValueError("Either chunk_size or period must be provided.")
+
+    if chunk_size is not None and chunk_size < 1:
+        raise ValueError("Chunk size must be a positive integer.")
+
+    if period is not None and period not in _PERIOD_KEYS:
+        raise ValueError(f"Period must be one of {', '.join(_PERIOD_KEYS)}.")
+
+    period_key = _PERIOD_KEYS.get(period)
+    rows = []
+    current_period = None
 
+    for row in iter_occurrences(events, start, end):
+        row_period = period_key(row["date"]) if period_key else None
 
+        if rows and (row_period != current_period or len(rows) == chunk_size):
+            yield pd.DataFrame(rows, columns=OCCURRENCE_COLUMNS).astype(OCCURRENCE_DTYPES)
+            rows = []
 
+        current_period = row_period
+        rows.append(row)
 
+    if rows:
+        yield pd.DataFrame(rows, columns=OCCURRENCE_COLUMNS).astype(OCCURRENCE_DTYPES)
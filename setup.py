@@ -1,9 +1,9 @@
-from setuptools import setup, find_packages
+from setuptools import setup
 
 setup(
     name="event_manager",
     version="1.0.0",
-    packages=find_packages(),
+    packages=["event_manager"],
     install_requires=[
         "numpy",
         "pandas",
@@ -12,6 +12,10 @@ setup(
         "tzdata",
         "SqlAlchemy",
     ],
+    extras_require={
+        "parquet": ["pyarrow"],  # occurrence_export
+        "async": ["aiosqlite", "greenlet"],  # async_crud with the default SQLite database
+    },
     description="A module for managing recurring events.",
     author="Jason Courrau",
     author_email="jasoncourrau@gmail.com",
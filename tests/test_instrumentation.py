@@ -0,0 +1,31 @@
+import re
+
+import pytest
+
+from event_manager import instrumentation
+
+METRIC_LINE = re.compile(r"^(# TYPE )?[a-zA-Z_:][a-zA-Z0-9_:]*( |$)")
+
+
+@pytest.fixture
+def recording():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+def test_to_prometheus_sanitizes_metric_names(recording):
+    instrumentation.incr("cache.hits", 2)
+    instrumentation.observe("OccurrenceWindow.get_occurrence_df", 0.5)
+    with instrumentation.timer("export-parquet"):
+        pass
+
+    text = instrumentation.to_prometheus()
+
+    assert "event_manager_cache_hits_total 2" in text
+    assert "event_manager_OccurrenceWindow_get_occurrence_df_seconds_count 1" in text
+    assert "event_manager_export_parquet_seconds_count 1" in text
+    for line in text.splitlines():
+        assert METRIC_LINE.match(line), line
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from event_manager.event import Event
+from event_manager.event_extensions import Transaction
+from event_manager.occurrence_cache import OccurrenceCache
+from event_manager.occurrence_store import OccurrenceStore
+from event_manager.utils import get_occurrence_df
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 6, 30)
+
+
+def _events():
+    rent = Transaction(
+        name="Rent", start_date=datetime(2024, 1, 1), recurrent_type="monthly", interval=1, days=[1],
+        amount=900.0, transaction_type="expense", user_id="u1"
+    )
+    rent.id = 1
+    standup = Event(name="Standup", start_date=datetime(2024, 1, 2), recurrent_type="weekly", interval=2, days=[1, 3])
+    return [rent, standup]
+
+
+@pytest.mark.parametrize("source", ["cache", "store"])
+def test_occurrence_df_matches_engine(source):
+    events = _events()
+    expected = get_occurrence_df(events, START, END)
+
+    if source == "cache":
+        df = OccurrenceCache().get_occurrence_df(events, START, END)
+    else:
+        store = OccurrenceStore(track_changes=False)
+        df = store.get_occurrence_df(events, START, END)
+        store.close()
+
+    pd.testing.assert_frame_equal(df, expected, check_categorical=False)
@@ -0,0 +1,34 @@
+from datetime import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from event_manager.event import Event
+from event_manager.occurrence_export import occurrences_table, read_occurrence_df, write_occurrences
+from event_manager.utils import get_occurrence_df
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 3, 31)
+
+
+def _events():
+    return [
+        Event(name="Standup", start_date=datetime(2024, 1, 1), recurrent_type="weekly", interval=1, days=[0, 2]),
+        Event(name="Review", start_date=datetime(2024, 1, 15), recurrent_type="monthly", interval=1, days=[15])
+    ]
+
+
+@pytest.mark.parametrize("format", ["parquet", "ipc"])
+@pytest.mark.parametrize("partition_by", [None, "month"])
+def test_write_plain_events(tmp_path, format, partition_by):
+    events = _events()
+    table = occurrences_table(events, START, END)
+    write_occurrences(table, str(tmp_path / "table"), format=format, partition_by=partition_by)
+    write_occurrences(get_occurrence_df(events, START, END), str(tmp_path / "df"), format=format, partition_by=partition_by)
+
+    for directory in ("table", "df"):
+        df = read_occurrence_df(str(tmp_path / directory), format=format)
+        assert len(df) == table.num_rows
+        assert sorted(df["name"].unique()) == ["Review", "Standup"]
+        assert df["user_id"].isna().all()
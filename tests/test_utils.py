@@ -0,0 +1,57 @@
+from datetime import datetime
+
+import pandas as pd
+
+from event_manager.event_extensions import Transaction
+from event_manager.utils import get_occurrence_df, iter_occurrence_chunks, iter_occurrences
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 3, 31)
+
+
+def _transactions():
+    rent = Transaction(
+        name="A", start_date=datetime(2024, 1, 1), recurrent_type="weekly", interval=1, days=[0, 3],
+        amount=100.0, transaction_type="expense", user_id="u1"
+    )
+    salary = Transaction(
+        name="B", start_date=datetime(2024, 1, 5), recurrent_type="weekly", interval=2, days=[0, 4],
+        amount=2500.0, transaction_type="income", user_id="u2"
+    )
+    rent.id, salary.id = 1, 2
+    return [rent, salary]
+
+
+def _sorted(df):
+    return df.sort_values(["event_id", "date"], kind="stable").reset_index(drop=True)
+
+
+def test_iter_occurrences_matches_get_occurrence_df():
+    events = _transactions()
+    streamed = pd.DataFrame(list(iter_occurrences(events, START, END)))
+    expected = get_occurrence_df(events, START, END)
+
+    assert set(streamed["event_id"]) == {1, 2}
+    pd.testing.assert_frame_equal(
+        _sorted(streamed).astype(expected.dtypes.to_dict()), _sorted(expected), check_categorical=False
+    )
+
+
+def test_iter_occurrences_keeps_event_order_on_same_date():
+    events = _transactions()
+    rows = list(iter_occurrences(events, START, END))
+
+    assert [row["date"] for row in rows] == sorted(row["date"] for row in rows)
+    for previous, row in zip(rows, rows[1:]):
+        if previous["date"] == row["date"]:
+            assert previous["event_id"] < row["event_id"]
+
+
+def test_iter_occurrence_chunks_have_occurrence_df_dtypes():
+    events = _transactions()
+    chunks = list(iter_occurrence_chunks(events, START, END, chunk_size=5, period="month"))
+    expected = get_occurrence_df(events, START, END)
+
+    for chunk in chunks:
+        assert chunk.dtypes.map(str).to_dict() == expected.dtypes.map(str).to_dict()
+    assert sum(len(chunk) for chunk in chunks) == len(expected)